@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import collections
 import functools
+import itertools
 import logging
 import random
 import secrets
@@ -87,6 +88,11 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    item_dependencies: Dict[int, Dict[str, Set[Entrance]]]
+    """per player, maps item names to the entrances whose access rules have read them while blocked, used by
+    CollectionState for worlds with `World.item_dependency_index`"""
+    sphere_cache: Optional[SphereCache]
+    """spheres of the current placements, see `cache_spheres`"""
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -166,6 +172,8 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.item_dependencies = {}
+        self.sphere_cache = None
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -497,6 +505,7 @@ class MultiWorld():
     def push_item(self, location: Location, item: Item, collect: bool = True):
         location.item = item
         item.location = location
+        self.sphere_cache = None
         if collect:
             self.state.collect(item, location.advancement, location)
 
@@ -581,6 +590,16 @@ class MultiWorld():
 
         return False
 
+    def cache_spheres(self) -> SphereCache:
+        """
+        Computes the logical spheres of the current placements once, so that get_spheres, get_sendable_spheres,
+        fulfills_accessibility and the spoiler can share them instead of each sweeping the multiworld again.
+        The cache is dropped by push_item; anything else changing placements or logic afterwards has to reset
+        `sphere_cache` to None.
+        """
+        self.sphere_cache = SphereCache(self)
+        return self.sphere_cache
+
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
@@ -589,6 +608,10 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
+        if self.sphere_cache:
+            yield from self.sphere_cache.get_spheres()
+            return
+
         state = CollectionState(self)
         locations = set(self.get_filled_locations())
 
@@ -624,21 +647,31 @@ class MultiWorld():
             else:
                 events.add(location)
 
+        # Events are collected as soon as they are reachable here, so each state is at least as far along as the state
+        # of the same sphere in get_spheres. Locations the sphere cache has in that or an earlier sphere are therefore
+        # known to be reachable and do not need to be checked.
+        cached_spheres = self.sphere_cache.spheres if self.sphere_cache else []
+        known_reachable: Set[Location] = set()
+        sphere_number = 0
+
         while locations:
             sphere: Set[Location] = set()
+            if sphere_number < len(cached_spheres):
+                known_reachable |= cached_spheres[sphere_number]
+            sphere_number += 1
 
             # cull events out
             done_events: Set[Union[Location, None]] = {None}
             while done_events:
                 done_events = set()
                 for event in events:
-                    if event.can_reach(state):
+                    if event in known_reachable or event.can_reach(state):
                         state.collect(event.item, True, event)
                         done_events.add(event)
                 events -= done_events
 
             for location in locations:
-                if location.can_reach(state):
+                if location in known_reachable or location.can_reach(state):
                     sphere.add(location)
 
             yield sphere
@@ -653,8 +686,6 @@ class MultiWorld():
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -662,6 +693,12 @@ class MultiWorld():
         }
         for player, world in self.worlds.items():
             players[world.options.accessibility.current_key].add(player)
+        if not state:
+            # the cached states collected every item, which is only the same as collecting the relevant ones below
+            # if no world counts other items
+            if self.sphere_cache and self.sphere_cache.progression_only:
+                return self.sphere_cache.fulfills_accessibility(players)
+            state = CollectionState(self)
 
         beatable_fulfilled = False
 
@@ -715,9 +752,140 @@ class MultiWorld():
         return False
 
 
+class SphereCache:
+    """
+    Logical spheres of a filled multiworld, along with the state before each sphere, see `MultiWorld.cache_spheres`.
+    The spheres are computed the same way as `MultiWorld.get_spheres` does.
+    """
+    spheres: List[Set[Location]]
+    """reachable locations of each sphere"""
+    unreachable: Set[Location]
+    """filled locations that are not reachable at all"""
+    states: List[CollectionState]
+    """states[i] has collected the items of spheres[:i], so states[-1] has collected every reachable item"""
+    progression_only: bool
+    """whether collecting non-progression items leaves states unchanged for every world, so that the states and the
+    progression locations of each sphere are also those of collecting only progression items"""
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        from worlds.AutoWorld import World
+        self.progression_only = all(type(world).collect is World.collect
+                                    and type(world).collect_item is World.collect_item
+                                    for world in multiworld.worlds.values())
+        self.spheres = []
+        state = CollectionState(multiworld)
+        self.states = [state.copy()]
+        locations = set(multiworld.get_filled_locations())
+        while locations:
+            sphere = {location for location in locations if location.can_reach(state)}
+            if not sphere:
+                break
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+            self.spheres.append(sphere)
+            self.states.append(state.copy())
+        self.unreachable = locations
+        final_state = self.states[-1]
+        # update reachability ahead of time, so that reading the final state does not change it
+        for player in multiworld.player_ids:
+            final_state.update_reachable_regions(player)
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """yields the same sets as `MultiWorld.get_spheres`"""
+        for sphere in self.spheres:
+            yield set(sphere)
+        if self.unreachable:
+            yield set()
+            yield set(self.unreachable)
+
+    def fulfills_accessibility(self, players: Dict[str, Set[int]]) -> bool:
+        """
+        Same as `MultiWorld.fulfills_accessibility` without a state, if `progression_only`.
+        As items only ever add to what is reachable, this only has to look at the final state.
+        """
+        state = self.states[-1].copy()
+        multiworld = state.multiworld
+        missing = [location for location in multiworld.get_locations()
+                   if (location.player in players["full"] or location.advancement)
+                   and (location in self.unreachable if location.item else not location.can_reach(state))]
+        if multiworld.has_beaten_game(state) and not any(
+                location.player in players["full"] or location.item.player not in players["minimal"]
+                for location in missing):
+            return True
+        if not missing:
+            return False
+        if __debug__:
+            from Fill import FillError
+            raise FillError(
+                f"Could not access required locations for accessibility check. Missing: {missing}",
+                multiworld=multiworld,
+            )
+        logging.warning(f"Could not access required locations for accessibility check."
+                        f" Missing: {missing}")
+        return False
+
+
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class ItemDependencyCounter(Counter):
+    """
+    Counter used for the prog_items of players whose world opted into `World.item_dependency_index`.
+
+    Records every item name read since `reads` was last cleared and every item name changed since `changed` was last
+    cleared, so CollectionState can tell which blocked entrances a newly collected item can possibly affect.
+    """
+    __slots__ = ("reads", "changed")
+
+    reads: Set[str]
+    changed: Set[str]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.reads = set()
+        self.changed = set()
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, item: str) -> int:
+        self.reads.add(item)
+        return dict.get(self, item, 0)
+
+    def get(self, item: str, default: Any = None) -> Any:
+        self.reads.add(item)
+        return dict.get(self, item, default)
+
+    def __contains__(self, item: object) -> bool:
+        self.reads.add(item)  # type: ignore[arg-type]
+        return dict.__contains__(self, item)
+
+    def __setitem__(self, item: str, count: int) -> None:
+        self.changed.add(item)
+        dict.__setitem__(self, item, count)
+
+    def __delitem__(self, item: str) -> None:
+        self.changed.add(item)
+        dict.__delitem__(self, item)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        # Counter.update uses dict.update when empty, which bypasses __setitem__
+        before = dict(self)
+        super().update(*args, **kwargs)
+        self.changed.update(item for item, count in self.items() if before.get(item) != count)
+
+    def clear(self) -> None:
+        self.changed.update(self.keys())
+        dict.clear(self)
+
+    def copy(self) -> ItemDependencyCounter:
+        ret = ItemDependencyCounter()
+        dict.update(ret, self)
+        ret.changed = self.changed.copy()
+        return ret
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -727,13 +895,20 @@ class CollectionState():
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     stale: Dict[int, bool]
+    shared_players: Set[int]
+    """players whose reachable_regions and blocked_connections may be shared with another copy of this state, so they
+    are copied before they are first written to"""
+    shared_path: bool
+    """whether path may be shared with another copy of this state, so it is copied before it is first written to"""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        indexed_players = {player for player, world in parent.worlds.items() if world.item_dependency_index}
+        self.prog_items = {player: ItemDependencyCounter() if player in indexed_players else Counter()
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
@@ -741,6 +916,8 @@ class CollectionState():
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.shared_players = set()
+        self.shared_path = False
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
             function(self, parent)
@@ -748,24 +925,89 @@ class CollectionState():
             for item in items:
                 self.collect(item, True)
 
+    def unshare(self, player: int) -> None:
+        """Copies the reachable regions and blocked connections of player, if they may be shared with another state."""
+        if player in self.shared_players:
+            self.shared_players.remove(player)
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+
+    def unshare_path(self) -> None:
+        """Copies the path, if it may be shared with another state."""
+        if self.shared_path:
+            self.shared_path = False
+            self.path = self.path.copy()
+
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
+        self.unshare(player)
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        player_prog_items = self.prog_items[player]
         start: Region = world.get_region(world.origin_region_name)
+        indexed = (isinstance(player_prog_items, ItemDependencyCounter) and world.explicit_indirect_conditions
+                   and not self.allow_partial_entrances)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
             reachable_regions.add(start)
             self.blocked_connections[player].update(start.exits)
-            queue.extend(start.exits)
+            queue = deque(self.blocked_connections[player])
+        elif indexed:
+            queue = deque(self._get_connections_affected_by_changes(player))
+        else:
+            queue = deque(self.blocked_connections[player])
+        if isinstance(player_prog_items, ItemDependencyCounter):
+            player_prog_items.changed.clear()
 
-        if world.explicit_indirect_conditions:
+        if indexed:
+            self._update_reachable_regions_indexed(player, queue)
+        elif world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def _get_connections_affected_by_changes(self, player: int) -> Set[Entrance]:
+        """Returns the blocked connections whose access rules read an item that changed since the last update."""
+        blocked_connections = self.blocked_connections[player]
+        dependencies = self.multiworld.item_dependencies.get(player, {})
+        affected: Set[Entrance] = set()
+        for item in self.prog_items[player].changed:
+            entrances = dependencies.get(item)
+            if entrances:
+                affected.update(entrance for entrance in entrances if entrance in blocked_connections)
+        return affected
+
+    def _update_reachable_regions_indexed(self, player: int, queue: deque):
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        reads = self.prog_items[player].reads
+        dependencies = self.multiworld.item_dependencies.setdefault(player, {})
+        # run BFS on the given connections, and remember which items the rules of those still blocked have read
+        while queue:
+            connection = queue.popleft()
+            new_region = connection.connected_region
+            if new_region in reachable_regions:
+                blocked_connections.remove(connection)
+                continue
+            reads.clear()
+            if connection.can_reach(self):
+                assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                reachable_regions.add(new_region)
+                blocked_connections.remove(connection)
+                blocked_connections.update(new_region.exits)
+                queue.extend(new_region.exits)
+                self.unshare_path()
+                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+
+                # Retry connections if the new region can unblock them
+                for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
+                    if new_entrance in blocked_connections and new_entrance not in queue:
+                        queue.append(new_entrance)
+            else:
+                for item in reads:
+                    dependencies.setdefault(item, set()).add(connection)
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -783,6 +1025,7 @@ class CollectionState():
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
+                self.unshare_path()
                 self.path[new_region] = (new_region.name, self.path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
@@ -810,22 +1053,31 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
+                    self.unshare_path()
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        # Reachable regions, blocked connections and the path are only written to by CollectionState itself, so they
+        # are shared with the copy, and either state copies them before it first writes to them.
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.path = self.path
+        self.shared_players = set(self.reachable_regions)
+        self.shared_path = True
+        ret.shared_players = set(self.reachable_regions)
+        ret.shared_path = True
+        ret.stale = self.stale.copy()
         ret.advancements = self.advancements.copy()
-        ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
-        ret.allow_partial_entrances = self.allow_partial_entrances
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -1139,6 +1391,7 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.shared_players.discard(item.player)
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1699,16 +1952,30 @@ class Spoiler:
         collection_spheres: List[Set[Location]] = []
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
+        sphere_cache = multiworld.sphere_cache
+        if sphere_cache and not sphere_cache.progression_only:
+            # the cached states collected every item, which some worlds count even if it isn't progression
+            sphere_cache = None
         logging.debug('Building up collection spheres.')
         while sphere_candidates:
 
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
+            if sphere_cache:
+                # no world's state changes from non-progression items, so collecting only progression finds the
+                # progression locations of the cached spheres, with the same states apart from locations_checked
+                # sphere is built in the same order as below, as culling depends on the iteration order of spheres
+                num = len(collection_spheres)
+                cached_sphere = sphere_cache.spheres[num] if num < len(sphere_cache.spheres) else set()
+                sphere = {location for location in sphere_candidates if location in cached_sphere}
+                state = sphere_cache.states[min(num + 1, len(sphere_cache.states) - 1)].copy()
+                state.locations_checked = {location for location in state.locations_checked if location.advancement}
+            else:
+                sphere = {location for location in sphere_candidates if state.can_reach(location)}
 
-            for location in sphere:
-                state.collect(location.item, True, location)
+                for location in sphere:
+                    state.collect(location.item, True, location)
 
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
@@ -1732,6 +1999,30 @@ class Spoiler:
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
+
+        def can_beat_game_from_sphere(num: int) -> bool:
+            """
+            Same result as `multiworld.can_beat_game(state_cache[num], required_locations)`, with a cheaper sweep.
+            With fewer items collected, locations can only become reachable later, never earlier, so the required
+            locations of collection sphere j can not be reachable before the (j - num)th sweep iteration and are only
+            checked from then on. For the same reason, if a sweep iteration collects nothing, nothing after it can.
+            """
+            state = state_cache[num]
+            state = state.copy() if state else CollectionState(multiworld)
+            if multiworld.has_beaten_game(state):
+                return True
+            pending: List[Location] = []
+            for next_sphere in itertools.chain(collection_spheres[num:], itertools.repeat(())):
+                pending.extend(location for location in next_sphere if location in required_locations)
+                reachable = {location for location in pending if location.can_reach(state)}
+                if not reachable:
+                    return False
+                for location in reachable:
+                    state.collect(location.item, True, location)
+                if multiworld.has_beaten_game(state):
+                    return True
+                pending = [location for location in pending if location not in reachable]
+
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
             to_delete: Set[Location] = set()
             for location in sphere:
@@ -1739,7 +2030,7 @@ class Spoiler:
                 logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
                               location.item.player)
                 required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
+                if can_beat_game_from_sphere(num):
                     to_delete.add(location)
                 else:
                     # still required, got to keep it around
@@ -4,7 +4,7 @@ import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock, Region
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -33,6 +33,94 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class LocationPool:
+    """
+    Unfilled locations kept in their original order and bucketed by parent region, so that searching for a location
+    to fill only has to look at locations whose region is reachable. Removal marks a location as filled instead of
+    shifting the underlying list. Iteration always yields locations in original order, so the first location found is
+    the same one a linear scan over the list would find.
+    """
+    locations: typing.List[Location]
+    filled: typing.List[bool]
+    by_region: typing.Dict[typing.Tuple[int, Region], typing.List[int]]
+    """indexes of the locations in each (player, parent region), ascending"""
+    unbucketed: typing.List[int]
+    """indexes of locations that may be fillable without their parent region being reachable"""
+
+    def __init__(self, locations: typing.Iterable[Location]) -> None:
+        self.locations = list(locations)
+        self.filled = [False] * len(self.locations)
+        self.by_region = {}
+        self.unbucketed = []
+        self._count = len(self.locations)
+        self._start = 0
+        self._reachable_regions: typing.Optional[typing.Set[typing.Tuple[int, Region]]] = None
+        self._candidates: typing.List[int] = []
+        for index, location in enumerate(self.locations):
+            if self._needs_region(location):
+                self.by_region.setdefault((location.player, location.parent_region), []).append(index)
+            else:
+                self.unbucketed.append(index)
+
+    @staticmethod
+    def _needs_region(location: Location) -> bool:
+        """Whether the location can only be filled with access checks if its parent region is reachable."""
+        location_type = type(location)
+        return (location.parent_region is not None
+                and "always_allow" not in location.__dict__
+                and location_type.always_allow is Location.always_allow
+                and location_type.can_fill is Location.can_fill
+                and location_type.can_reach is Location.can_reach)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def remove(self, index: int) -> Location:
+        """Marks the location at index as filled and returns it."""
+        self.filled[index] = True
+        self._count -= 1
+        filled = self.filled
+        start = self._start
+        while start < len(filled) and filled[start]:
+            start += 1
+        self._start = start
+        return self.locations[index]
+
+    def update(self, state: CollectionState) -> None:
+        """Refreshes which regions are reachable, to be called whenever the state used for access checks changes."""
+        reachable_regions = {key for key in self.by_region if key[1].can_reach(state)}
+        filled = self.filled
+        if reachable_regions == self._reachable_regions:
+            self._candidates = [index for index in self._candidates if not filled[index]]
+        else:
+            self._reachable_regions = reachable_regions
+            self._candidates = sorted(index for index in itertools.chain(
+                self.unbucketed, *(self.by_region[key] for key in reachable_regions)) if not filled[index])
+
+    def candidates(self) -> typing.Iterator[typing.Tuple[int, Location]]:
+        """Yields index and location of unfilled locations that may be reachable in the last updated state."""
+        filled = self.filled
+        locations = self.locations
+        for index in self._candidates:
+            if not filled[index]:
+                yield index, locations[index]
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[int, Location]]:
+        """Yields index and location of all unfilled locations."""
+        filled = self.filled
+        locations = self.locations
+        for index in range(self._start, len(locations)):
+            if not filled[index]:
+                yield index, locations[index]
+
+    def remaining(self) -> typing.List[Location]:
+        """Returns the unfilled locations in their original order."""
+        return [location for location, filled in zip(self.locations, self.filled) if not filled]
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -63,7 +151,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    location_pool = LocationPool(locations)
+    while any(reachable_items.values()) and location_pool:
         if one_item_per_player:
             # grab one item per player
             items_to_place = [items.pop()
@@ -87,10 +176,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        location_pool.update(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not location_pool:
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
@@ -105,12 +195,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
+            # without access checks unreachable locations are valid too, otherwise only look at reachable regions
+            for i, location in (location_pool.candidates() if perform_access_check else location_pool):
                 if (not single_player_placement or location.player == item_to_place.player) \
                         and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
+                    spot_to_fill = location_pool.remove(i)
                     break
 
             else:
@@ -206,6 +295,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             if on_place:
                 on_place(spot_to_fill)
 
+    locations[:] = location_pool.remaining()
+
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
@@ -276,15 +367,14 @@ def remaining_fill(multiworld: MultiWorld,
         def location_can_fill_item(location_to_fill: Location, item_to_fill: Item):
             return location_to_fill.item_rule(item_to_fill)
 
-    while locations and itempool:
+    location_pool = LocationPool(locations)
+    while location_pool and itempool:
         item_to_place = itempool.pop()
         spot_to_fill: typing.Optional[Location] = None
 
-        for i, location in enumerate(locations):
+        for i, location in location_pool:
             if location_can_fill_item(location, item_to_place):
-                # popping by index is faster than removing by content,
-                spot_to_fill = locations.pop(i)
-                # skipping a scan for the element
+                spot_to_fill = location_pool.remove(i)
                 break
 
         else:
@@ -329,6 +419,8 @@ def remaining_fill(multiworld: MultiWorld,
         if not placed % 1000:
             _log_fill_progress(name, placed, total)
 
+    locations[:] = location_pool.remaining()
+
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
@@ -415,7 +507,9 @@ def distribute_early_items(multiworld: MultiWorld,
         loc_indexes_to_remove: typing.Set[int] = set()
         base_state = multiworld.state.copy()
         base_state.sweep_for_advancements(locations=(loc for loc in multiworld.get_filled_locations() if loc.address is None))
-        for i, loc in enumerate(fill_locations):
+        location_pool = LocationPool(fill_locations)
+        location_pool.update(base_state)
+        for i, loc in location_pool.candidates():
             if loc.can_reach(base_state):
                 if loc.progress_type == LocationProgressType.PRIORITY:
                     early_priority_locations.append(loc)
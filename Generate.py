@@ -57,6 +57,9 @@ def mystery_argparse(argv: list[str] | None = None):
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record time and memory used by each generation stage, world and slot, "
+                             "written as JSON next to the output.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -1,4 +1,5 @@
 import collections
+import contextlib
 from collections.abc import Mapping
 import concurrent.futures
 import logging
@@ -7,15 +8,14 @@ import tempfile
 import time
 from typing import Any
 import zipfile
-import zlib
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
-from NetUtils import convert_to_base_types
+from NetUtils import convert_to_base_types, encode_multidata
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import GenerationProfiler, __version__, output_path, restricted_dumps, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -24,6 +24,28 @@ __all__ = ["main"]
 
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    if not args.profile:
+        return _main(args, seed, baked_server_options, None)
+
+    profiler = GenerationProfiler()
+    profiler.start()
+    try:
+        multiworld = _main(args, seed, baked_server_options, profiler)
+    finally:
+        profiler.stop()
+    profile_file = output_path(f"AP_{multiworld.seed_name}_profile.json")
+    profiler.write(profile_file, multiworld)
+    logging.info(f"Wrote generation profile to {profile_file}")
+    return multiworld
+
+
+def _main(args, seed, baked_server_options: dict[str, object] | None, profiler: GenerationProfiler | None):
+    def stage(name: str) -> contextlib.AbstractContextManager[None]:
+        return profiler.stage(name) if profiler else contextlib.nullcontext()
+
+    def profiled(name: str, function):
+        return profiler.wrap(name, function) if profiler else function
+
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -71,9 +93,11 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     # This assertion method should not be necessary to run if we are not outputting any multidata.
     if not args.skip_output and not args.spoiler_only:
-        AutoWorld.call_stage(multiworld, "assert_generate")
+        with stage("assert_generate"):
+            AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    with stage("generate_early"):
+        AutoWorld.call_all(multiworld, "generate_early")
 
     logger.info('')
 
@@ -109,13 +133,16 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    with stage("create_regions"):
+        AutoWorld.call_all(multiworld, "create_regions")
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    with stage("create_items"):
+        AutoWorld.call_all(multiworld, "create_items")
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    with stage("set_rules"):
+        AutoWorld.call_all(multiworld, "set_rules")
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -141,8 +168,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     multiworld.plando_item_blocks = parse_planned_blocks(multiworld)
 
-    AutoWorld.call_all(multiworld, "connect_entrances")
-    AutoWorld.call_all(multiworld, "generate_basic")
+    with stage("connect_entrances"):
+        AutoWorld.call_all(multiworld, "connect_entrances")
+    with stage("generate_basic"):
+        AutoWorld.call_all(multiworld, "generate_basic")
 
     # remove starting inventory from pool items.
     # Because some worlds don't actually create items during create_items this has to be as late as possible.
@@ -185,25 +214,30 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
-    resolve_early_locations_for_planned(multiworld)
-    distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
-                                           for x in multiworld.plando_item_blocks[player]])
+    with stage("item_plando"):
+        resolve_early_locations_for_planned(multiworld)
+        distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
+                                               for x in multiworld.plando_item_blocks[player]])
 
     logger.info('Running Pre Main Fill.')
 
-    AutoWorld.call_all(multiworld, "pre_fill")
+    with stage("pre_fill"):
+        AutoWorld.call_all(multiworld, "pre_fill")
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with stage("fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
-    AutoWorld.call_all(multiworld, 'post_fill')
+    with stage("post_fill"):
+        AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with stage("progression_balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -217,12 +251,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + multiworld.seed_name
 
+    # placements are final, so spheres are computed once for the accessibility check, multidata and spoiler
+    with stage("cache_spheres"):
+        multiworld.cache_spheres()
+
     if args.spoiler_only:
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+        with stage("spoiler"):
+            if args.spoiler > 1:
+                logger.info('Calculating playthrough.')
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
-        multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+            multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
         return multiworld
 
@@ -230,18 +269,22 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
+        with stage("output"), concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+            check_accessibility_task = pool.submit(profiled("fulfills_accessibility",
+                                                            multiworld.fulfills_accessibility))
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+            output_file_futures = [pool.submit(profiled("generate_output stage", AutoWorld.call_stage),
+                                               multiworld, "generate_output", temp_dir)]
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
                 output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                    pool.submit(profiled(f"generate_output {player}", AutoWorld.call_single),
+                                multiworld, "generate_output", player, temp_dir))
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
-            AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
+            with stage("extend_hint_information"):
+                AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
 
             def write_multidata():
                 import NetUtils
@@ -350,13 +393,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                    f.write(encode_multidata(multidata, restricted_dumps))
 
-            output_file_futures.append(pool.submit(write_multidata))
+            output_file_futures.append(pool.submit(profiled("write_multidata", write_multidata)))
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -369,17 +409,18 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
 
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+        with stage("spoiler"):
+            if args.spoiler > 1:
+                logger.info('Calculating playthrough.')
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
-        if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            if args.spoiler:
+                multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
+        with stage("zip"), zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
+                                           compresslevel=9) as zf:
             for file in os.scandir(temp_dir):
                 zf.write(file.path, arcname=file.name)
 
@@ -59,6 +59,10 @@ server_per_message_deflate_factory = ServerPerMessageDeflateFactory(
     compress_settings={"memLevel": 4},
 )
 
+encoded_game_packages: typing.Dict[typing.Tuple[str, str], str] = {}
+"""(game, checksum) -> the game's data package as a JSON '"game":{...}' fragment of a DataPackage message.
+The data of a checksum never changes, so this is shared by all Contexts of a process."""
+
 
 def remove_from_list(container, value):
     try:
@@ -133,6 +137,149 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+class SaveJournal:
+    """
+    Tracks what changed in `Context.get_save` since it was last written, so that a save only has to append a small
+    record of the changes, with a full snapshot written only once the records grow large compared to it.
+    Records carry the generation of the snapshot they apply to, so stale records are never replayed onto a newer
+    snapshot, even if writing the snapshot and clearing the journal did not both happen.
+    """
+    appended_entries: typing.ClassVar[typing.FrozenSet[str]] = frozenset({"received_items"})
+    """save entries of lists that are only ever appended to"""
+    keyed_entries: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "hints_used", "hints", "location_checks", "name_aliases", "client_game_state", "group_collected",
+    })
+    """save entries of dicts, of which only changed keys are recorded"""
+    paired_entries: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "client_activity_timers", "client_connection_timers", "video",
+    })
+    """save entries of key, value pairs, of which only changed keys are recorded"""
+    compaction_ratio: float = 0.5
+    """write a snapshot once the journal grows larger than this share of the last snapshot"""
+
+    generation: typing.Optional[str]
+    snapshot_size: int
+    journal_size: int
+    changed_stored_data: typing.Set[str]
+    """keys of stored_data changed since the last record, as values may be modified in place"""
+    _lengths: typing.Dict[str, typing.Dict[typing.Any, int]]
+    _values: typing.Dict[str, typing.Any]
+
+    def __init__(self) -> None:
+        self.generation = None
+        self.snapshot_size = 0
+        self.journal_size = 0
+        self.changed_stored_data = set()
+        self._lengths = {}
+        self._values = {}
+
+    @staticmethod
+    def _frozen(value: typing.Any) -> typing.Any:
+        return frozenset(value) if isinstance(value, (set, frozenset)) else value
+
+    def _set_baseline(self, save: typing.Dict[str, typing.Any]) -> None:
+        self._lengths = {entry: {key: len(values) for key, values in save.get(entry, {}).items()}
+                         for entry in self.appended_entries}
+        self._values = {}
+        for entry, value in save.items():
+            if entry in self.keyed_entries:
+                self._values[entry] = {key: self._frozen(sub_value) for key, sub_value in value.items()}
+            elif entry in self.paired_entries:
+                self._values[entry] = {tuple(key): sub_value for key, sub_value in value}
+            elif entry != "stored_data":
+                self._values[entry] = copy.deepcopy(value)
+        self.changed_stored_data.clear()
+
+    def snapshot_due(self) -> bool:
+        return not self.snapshot_size or self.journal_size > self.snapshot_size * self.compaction_ratio
+
+    def snapshot(self, save: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        """Start a new generation from a full save, returning it to be written as the new snapshot."""
+        import uuid
+        self.generation = save["journal_generation"] = uuid.uuid4().hex
+        self._set_baseline(save)
+        self.journal_size = 0
+        return save
+
+    def snapshot_written(self, size: int) -> None:
+        self.snapshot_size = size
+
+    def record(self, save: typing.Dict[str, typing.Any]) -> typing.Optional[bytes]:
+        """Encode what changed since the last record or snapshot, or None if nothing did."""
+        appended: typing.Dict[str, typing.Dict[typing.Any, list]] = {}
+        updated: typing.Dict[str, typing.Dict[typing.Any, typing.Any]] = {}
+        removed: typing.Dict[str, typing.List[typing.Any]] = {}
+        replaced: typing.Dict[str, typing.Any] = {}
+        for entry, value in save.items():
+            if entry in self.appended_entries:
+                lengths = self._lengths.setdefault(entry, {})
+                for key, values in value.items():
+                    length = lengths.get(key, 0)
+                    if len(values) > length:
+                        appended.setdefault(entry, {})[key] = values[length:]
+                        lengths[key] = len(values)
+            elif entry in self.keyed_entries or entry in self.paired_entries:
+                current = value if entry in self.keyed_entries else {tuple(key): sub_value for key, sub_value in value}
+                previous = self._values.setdefault(entry, {})
+                for key, sub_value in current.items():
+                    frozen = self._frozen(sub_value)
+                    if key not in previous or previous[key] != frozen:
+                        updated.setdefault(entry, {})[key] = copy.copy(sub_value)
+                        previous[key] = frozen
+                for key in previous.keys() - current.keys():
+                    removed.setdefault(entry, []).append(key)
+                    del previous[key]
+            elif entry == "stored_data":
+                if self.changed_stored_data:
+                    updated[entry] = {key: value[key] for key in self.changed_stored_data if key in value}
+                    self.changed_stored_data.clear()
+            elif entry not in self._values or self._values[entry] != value:
+                replaced[entry] = self._values[entry] = copy.deepcopy(value)
+        if not (appended or updated or removed or replaced):
+            return None
+        record = zlib.compress(pickle.dumps({"generation": self.generation, "append": appended, "update": updated,
+                                             "remove": removed, "replace": replaced}))
+        self.journal_size += len(record)
+        return record
+
+    @classmethod
+    def replay(cls, save: typing.Dict[str, typing.Any], records: typing.Iterable[bytes]) -> typing.Dict[str, typing.Any]:
+        """Apply the records that belong to the generation of a snapshot to it."""
+        generation = save.get("journal_generation")
+        for encoded_record in records:
+            record = restricted_loads(zlib.decompress(encoded_record))
+            if generation is None or record["generation"] != generation:
+                continue
+            for entry, appended in record["append"].items():
+                target = save.setdefault(entry, {})
+                for key, values in appended.items():
+                    target.setdefault(key, []).extend(values)
+            for entry in record["update"].keys() | record["remove"].keys():
+                if entry in cls.paired_entries:
+                    target = {tuple(key): value for key, value in save.get(entry, ())}
+                else:
+                    target = save.setdefault(entry, {})
+                target.update(record["update"].get(entry, {}))
+                for key in record["remove"].get(entry, ()):
+                    target.pop(key, None)
+                if entry in cls.paired_entries:
+                    save[entry] = tuple(target.items())
+            save.update(record["replace"])
+        return save
+
+    def load(self, save: typing.Dict[str, typing.Any], snapshot_size: int,
+             records: typing.Iterable[bytes]) -> typing.Dict[str, typing.Any]:
+        """Replay a journal onto its snapshot, continuing the journal from the result."""
+        records = list(records)
+        save = self.replay(save, records)
+        self.generation = save.get("journal_generation")
+        self._set_baseline(save)
+        # a snapshot written without journaling needs to be replaced before records can apply to it
+        self.snapshot_size = snapshot_size if self.generation else 0
+        self.journal_size = sum(map(len, records))
+        return save
+
+
 class Client(Endpoint):
     __slots__ = (
         "__weakref__",
@@ -206,6 +353,60 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+def build_game_tables(gamespackage: typing.Mapping[str, typing.Dict[str, typing.Any]],
+                      item_name_groups: typing.Mapping[str, typing.Any],
+                      location_name_groups: typing.Mapping[str, typing.Any],
+                      prepared: typing.Optional[typing.Dict[str, typing.Any]] = None) -> typing.Dict[str, typing.Any]:
+    """
+    Builds the checksum and name lookup tables of a Context for the games of gamespackage,
+    keyed by the name of the Context attribute they belong to.
+
+    :param prepared: tables built before. Games with the very same data package there reuse their tables,
+        which are then shared and must not be modified. Looking up unknown ids in the name tables does not add them.
+    """
+    prepared_packages = prepared["game_table_packages"] if prepared else {}
+    tables: typing.Dict[str, typing.Any] = {
+        "game_table_packages": {},
+        "checksums": {},
+        "item_names": collections.defaultdict(
+            lambda: Utils.NonInsertingKeyedDefaultDict(lambda code: f'Unknown item (ID:{code})')),
+        "location_names": collections.defaultdict(
+            lambda: Utils.NonInsertingKeyedDefaultDict(lambda code: f'Unknown location (ID:{code})')),
+        "all_item_and_group_names": {},
+        "all_location_and_group_names": {},
+    }
+    item_names = tables["item_names"]
+    location_names = tables["location_names"]
+    new_games: typing.List[str] = []
+    for game_name, game_package in gamespackage.items():
+        tables["game_table_packages"][game_name] = game_package
+        if prepared and prepared_packages.get(game_name) is game_package:
+            for key, table in tables.items():
+                if key != "game_table_packages" and game_name in prepared[key]:
+                    table[game_name] = prepared[key][game_name]
+            continue
+
+        new_games.append(game_name)
+        if "checksum" in game_package:
+            tables["checksums"][game_name] = game_package["checksum"]
+        for item_name, item_id in game_package["item_name_to_id"].items():
+            item_names[game_name][item_id] = item_name
+        for location_name, location_id in game_package["location_name_to_id"].items():
+            location_names[game_name][location_id] = location_name
+        tables["all_item_and_group_names"][game_name] = \
+            set(game_package["item_name_to_id"]) | set(item_name_groups[game_name])
+        tables["all_location_and_group_names"][game_name] = \
+            set(game_package["location_name_to_id"]) | set(location_name_groups.get(game_name, []))
+
+    archipelago_item_names = item_names["Archipelago"]
+    archipelago_location_names = location_names["Archipelago"]
+    for game in [game_name for game_name in new_games if game_name != "Archipelago"]:
+        # Add Archipelago items and locations to each data package.
+        item_names[game].update(archipelago_item_names)
+        location_names[game].update(archipelago_location_names)
+    return tables
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -241,14 +442,15 @@ class Context:
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
-    spheres: typing.List[typing.Dict[int, typing.Set[int]]]
-    """ each sphere is { player: { location_id, ... } } """
+    _spheres: typing.Optional[typing.List[typing.Dict[int, typing.Set[int]]]]
+    _load_spheres: typing.Callable[[], typing.List[typing.Dict[int, typing.Set[int]]]]
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
                  hint_cost: int, item_cheat: bool, release_mode: str = "disabled", collect_mode="disabled",
                  countdown_mode: str = "auto", remaining_mode: str = "disabled", auto_shutdown: typing.SupportsFloat = 0, 
-                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger()):
+                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger(),
+                 save_journal: bool = False, outbound_batch_ms: int = 0):
         self.logger = logger
         super(Context, self).__init__()
         self.slot_info = {}
@@ -260,6 +462,12 @@ class Context:
         self.data_filename = None
         self.save_filename = None
         self.saving = False
+        self.save_journal: typing.Optional[SaveJournal] = SaveJournal() if save_journal else None
+        # with outbound_batch_ms, messages are queued per endpoint and sent as one frame when the window ends
+        self.outbound_batch_ms: int = outbound_batch_ms
+        self.outbound_queues: typing.Dict[Endpoint, typing.List[str]] = {}
+        self.outbound_flush_handle: typing.Optional[asyncio.TimerHandle] = None
+        self.outbound_counts: typing.Counter[str] = collections.Counter()
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
         self.connect_names = {}  # names of slots clients can connect to
@@ -271,6 +479,8 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        # slots that received items not yet sent to their clients by send_new_items
+        self.new_item_slots: typing.Set[team_slot] = set()
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -278,6 +488,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # (team, finding_player, location) -> hints in the finding player's hints, kept in step with self.hints
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -308,6 +520,7 @@ class Context:
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self._load_spheres = list
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -317,10 +530,14 @@ class Context:
         self.all_item_and_group_names = {}
         self.all_location_and_group_names = {}
         self.item_names = collections.defaultdict(
-            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})'))
+            lambda: Utils.NonInsertingKeyedDefaultDict(lambda code: f'Unknown item (ID:{code})'))
         self.location_names = collections.defaultdict(
-            lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown location (ID:{code})'))
+            lambda: Utils.NonInsertingKeyedDefaultDict(lambda code: f'Unknown location (ID:{code})'))
         self.non_hintable_names = collections.defaultdict(frozenset)
+        # tables from build_game_tables made ahead of time, such as for the static games of a WebHost hoster
+        self.prepared_game_tables: typing.Dict[str, typing.Any] = {}
+        # like encoded_game_packages, for game data packages without a checksum
+        self.encoded_game_packages: typing.Dict[str, str] = {}
 
         self._load_game_data()
 
@@ -342,24 +559,11 @@ class Context:
             del game_package["location_name_groups"]
 
     def _init_game_data(self):
-        for game_name, game_package in self.gamespackage.items():
-            if "checksum" in game_package:
-                self.checksums[game_name] = game_package["checksum"]
-            for item_name, item_id in game_package["item_name_to_id"].items():
-                self.item_names[game_name][item_id] = item_name
-            for location_name, location_id in game_package["location_name_to_id"].items():
-                self.location_names[game_name][location_id] = location_name
-            self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
-            self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
-
-        archipelago_item_names = self.item_names["Archipelago"]
-        archipelago_location_names = self.location_names["Archipelago"]
-        for game in [game_name for game_name in self.gamespackage if game_name != "Archipelago"]:
-            # Add Archipelago items and locations to each data package.
-            self.item_names[game].update(archipelago_item_names)
-            self.location_names[game].update(archipelago_location_names)
+        tables = build_game_tables(self.gamespackage, self.item_name_groups, self.location_name_groups,
+                                   self.prepared_game_tables)
+        del tables["game_table_packages"]
+        for key, value in tables.items():
+            setattr(self, key, value)
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -367,11 +571,32 @@ class Context:
     def location_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
+    def get_encoded_game_package(self, game: str) -> str:
+        game_package = self.gamespackage[game]
+        checksum = game_package.get("checksum")
+        if checksum:
+            fragment = encoded_game_packages.get((game, checksum))
+            if fragment is None:
+                fragment = encoded_game_packages[game, checksum] = f"{self.dumper(game)}:{self.dumper(game_package)}"
+        else:
+            fragment = self.encoded_game_packages.get(game)
+            if fragment is None:
+                fragment = self.encoded_game_packages[game] = f"{self.dumper(game)}:{self.dumper(game_package)}"
+        return fragment
+
+    def encode_data_package(self, games: typing.Iterable[str]) -> str:
+        """Encodes a DataPackage message of the given games out of their cached encoded data packages."""
+        return '[{"cmd":"DataPackage","data":{"games":{' + \
+            ",".join(self.get_encoded_game_package(game) for game in games) + '}}}]'
+
     # General networking
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
         msg = self.dumper(msgs)
+        if self.outbound_batch_ms:
+            self.queue_encoded_msgs(endpoint, msg)
+            return True
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -384,6 +609,14 @@ class Context:
             return True
 
     async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        if not endpoint.socket or not endpoint.socket.open:
+            return False
+        if self.outbound_batch_ms:
+            self.queue_encoded_msgs(endpoint, msg)
+            return True
+        return await self._send_encoded_msgs(endpoint, msg)
+
+    async def _send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
         try:
@@ -398,6 +631,11 @@ class Context:
             return True
 
     async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        if self.outbound_batch_ms:
+            for endpoint in endpoints:
+                if endpoint.socket and endpoint.socket.open:
+                    self.queue_encoded_msgs(endpoint, msg)
+            return True
         sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
@@ -412,6 +650,33 @@ class Context:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
+    def queue_encoded_msgs(self, endpoint: Endpoint, msg: str) -> None:
+        """Queues an encoded list of messages for endpoint, to be sent combined with the others queued for it
+        once the outbound batch window ends."""
+        queue = self.outbound_queues.get(endpoint)
+        if queue is None:
+            queue = self.outbound_queues[endpoint] = []
+        queue.append(msg)
+        self.outbound_counts["messages"] += 1
+        if not self.outbound_flush_handle:
+            self.outbound_flush_handle = asyncio.get_running_loop().call_later(self.outbound_batch_ms / 1000,
+                                                                               self.flush_outbound)
+
+    def flush_outbound(self) -> None:
+        """Sends each endpoint everything queued for it as a single frame, keeping the order they were queued in."""
+        if self.outbound_flush_handle:
+            self.outbound_flush_handle.cancel()
+            self.outbound_flush_handle = None
+        queues, self.outbound_queues = self.outbound_queues, {}
+        for endpoint, queue in queues.items():
+            if len(queue) == 1:
+                msg = queue[0]
+            else:
+                # each is an encoded list, so they join into one by their contents
+                msg = "[" + ",".join(queued[1:-1] for queued in queue if queued != "[]") + "]"
+            self.outbound_counts["frames"] += 1
+            async_start(self._send_encoded_msgs(endpoint, msg))
+
     def broadcast_all(self, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
         data = self.dumper(msgs)
@@ -479,11 +744,8 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
+        return NetUtils.decode_multidata(data)
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -540,6 +802,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.rebuild_hint_index()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -568,8 +831,23 @@ class Context:
         for game_name, data in self.location_name_groups.items():
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
-        # sorted access spheres
-        self.spheres = decoded_obj.get("spheres", [])
+        # sorted access spheres, only decoded once needed if the multidata format allows it
+        if isinstance(decoded_obj, NetUtils.LazyMultiData):
+            self._spheres = None
+            self._load_spheres = decoded_obj.section_loader("spheres", [])
+        else:
+            self.spheres = decoded_obj.get("spheres", [])
+
+    @property
+    def spheres(self) -> typing.List[typing.Dict[int, typing.Set[int]]]:
+        """ each sphere is { player: { location_id, ... } } """
+        if self._spheres is None:
+            self._spheres = self._load_spheres()
+        return self._spheres
+
+    @spheres.setter
+    def spheres(self, spheres: typing.List[typing.Dict[int, typing.Set[int]]]) -> None:
+        self._spheres = spheres
 
     # saving
 
@@ -586,16 +864,61 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            self._store_save(self.get_save(), exit_save)
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
+    def _store_save(self, save: dict, exit_save: bool = False) -> None:
+        """Store a save, only appending what changed to the journal if journaling and no snapshot is due."""
+        journal = self.save_journal
+        if journal and not exit_save and not journal.snapshot_due():
+            record = journal.record(save)
+            if record:
+                self._append_save_journal(record)
+        elif journal:
+            journal.snapshot_written(self._write_save_snapshot(journal.snapshot(save)))
+        else:
+            self._write_save_snapshot(save)
+
+    @property
+    def save_journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
+    def _write_save_snapshot(self, save: dict) -> int:
+        """Write a full save, replacing any journal. Returns its size."""
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded_save = zlib.compress(pickle.dumps(save))
+        with open(self.save_filename, "wb") as f:
+            f.write(encoded_save)
+        if self.save_journal:
+            with open(self.save_journal_filename, "wb"):
+                pass
+        return len(encoded_save)
+
+    def _append_save_journal(self, record: bytes) -> None:
+        with open(self.save_journal_filename, "ab") as f:
+            f.write(len(record).to_bytes(4, "little") + record)
+
+    def _read_save_journal(self) -> typing.List[bytes]:
+        """Read the records of the journal, ignoring a record cut short by a crash while appending it."""
+        try:
+            with open(self.save_journal_filename, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records: typing.List[bytes] = []
+        position = 0
+        while position + 4 <= len(data):
+            end = position + 4 + int.from_bytes(data[position:position + 4], "little")
+            if end > len(data):
+                break
+            records.append(data[position + 4:end])
+            position = end
+        return records
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -606,8 +929,11 @@ class Context:
                     else self.data_filename + '_' + 'apsave'
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    encoded_save = f.read()
+                save_data = restricted_loads(zlib.decompress(encoded_save))
+                if self.save_journal:
+                    save_data = self.save_journal.load(save_data, len(encoded_save), self._read_save_journal())
+                self.set_save(save_data)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -682,6 +1008,7 @@ class Context:
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.rebuild_hint_index()
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -740,6 +1067,8 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                if hint_slot == hint.finding_player:
+                    self._reindex_hint(hint_team, hint, new_hint)
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
@@ -747,10 +1076,47 @@ class Context:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
 
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the given locations of a slot, such as after they were checked.
+        If a set is passed for 'changed', each (team,slot) pair that has at least one hint modified
+        will be added to the set."""
+        for location in locations:
+            hints = self.hint_index.get((team, slot, location))
+            if not hints:
+                continue
+            for hint in list(hints):
+                new_hint = hint.re_check(self, team)
+                if hint == new_hint:
+                    continue
+                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                    if changed is not None:
+                        changed.add((team, player))
+                    self.replace_hint(team, player, hint, new_hint)
+
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
+    def rebuild_hint_index(self) -> None:
+        """Rebuilds the location index of hints from scratch, for after self.hints was replaced wholesale."""
+        self.hint_index.clear()
+        for (team, slot), hints in self.hints.items():
+            for hint in hints:
+                if hint.finding_player == slot:
+                    self.hint_index.setdefault((team, slot, hint.location), set()).add(hint)
+
+    def _reindex_hint(self, team: int, old_hint: typing.Optional[Hint], new_hint: typing.Optional[Hint]) -> None:
+        if old_hint is not None:
+            key = team, old_hint.finding_player, old_hint.location
+            hints = self.hint_index.get(key)
+            if hints is not None:
+                hints.discard(old_hint)
+                if not hints:
+                    del self.hint_index[key]
+        if new_hint is not None:
+            self.hint_index.setdefault((team, new_hint.finding_player, new_hint.location), set()).add(new_hint)
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -817,6 +1183,7 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self._reindex_hint(team, None, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
@@ -835,15 +1202,16 @@ class Context:
                     async_start(self.send_msgs(client, client_hints))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
+        for hint in self.hint_index.get((team, finding_player, seeked_location), ()):
+            return hint
         return None
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            if slot == old_hint.finding_player:
+                self._reindex_hint(team, old_hint, new_hint)
     
     # "events"
 
@@ -1066,20 +1434,21 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Sends ReceivedItems to the clients of the slots that received items since the last call."""
+    new_item_slots, ctx.new_item_slots = ctx.new_item_slots, set()
+    for team, slot in new_item_slots:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1093,8 +1462,8 @@ def release_player(ctx: Context, team: int, slot: int):
     ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
-    update_checked_locations(ctx, team, slot)
+    if not register_location_checks_bulk(ctx, team, {slot: all_locations}):
+        update_checked_locations(ctx, team, slot)
 
 
 def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
@@ -1104,8 +1473,9 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
-    for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+    new_checks = register_location_checks_bulk(ctx, team, all_locations, count_activity=False)
+    for source_player in all_locations.keys() - new_checks.keys():
+        # nothing new was checked, still let the client know its state
         update_checked_locations(ctx, team, source_player)
 
     if not is_group:
@@ -1127,14 +1497,27 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
                              count_activity: bool = True):
-    slot_locations = ctx.locations[slot]
-    new_locations = set(locations) - ctx.location_checks[team, slot]
-    new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
-    if new_locations:
+    register_location_checks_bulk(ctx, team, {slot: locations}, count_activity)
+
+
+def register_location_checks_bulk(ctx: Context, team: int, checks: typing.Mapping[int, typing.Iterable[int]],
+                                  count_activity: bool = True) -> typing.Dict[int, typing.Set[int]]:
+    """Registers the checks of many slots of a team in one pass,
+    sending items, RoomUpdates and changed hints only once per affected slot.
+    Returns the newly checked locations of each slot that gained any."""
+    new_checks: typing.Dict[int, typing.Set[int]] = {}
+    info_texts: list[dict[str, typing.Any]] = []
+    for slot, locations in checks.items():
+        slot_locations = ctx.locations[slot]
+        new_locations = set(locations) - ctx.location_checks[team, slot]
+        new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
+        if not new_locations:
+            continue
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
 
@@ -1145,7 +1528,6 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             # sort/group by receiver and item
             sortable.append((target_player, item_id, location, flags))
 
-        info_texts: list[dict[str, typing.Any]] = []
         for target_player, item_id, location, flags in sorted(sortable):
             new_item = NetworkItem(item_id, location, slot, flags)
             send_items_to(ctx, team, target_player, new_item)
@@ -1159,22 +1541,30 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
                 ctx.broadcast_team(team, info_texts)
                 info_texts.clear()
             info_texts.append(json_format_send_event(new_item, target_player))
-        ctx.broadcast_team(team, info_texts)
-        del info_texts
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
-        send_new_items(ctx)
+        new_checks[slot] = new_locations
+
+    if not new_checks:
+        return new_checks
+    ctx.broadcast_team(team, info_texts)
+    del info_texts
+
+    send_new_items(ctx)
+    for slot, new_locations in new_checks.items():
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
             "hint_points": get_slot_points(ctx, team, slot),
             "checked_locations": new_locations,  # send back new checks only
         }])
-        updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
-        for hint_team, hint_slot in updated_slots:
-            ctx.on_changed_hints(hint_team, hint_slot)
-        ctx.save()
+    updated_slots: typing.Set[tuple[int, int]] = set()
+    for slot, new_locations in new_checks.items():
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
+    for hint_team, hint_slot in updated_slots:
+        ctx.on_changed_hints(hint_team, hint_slot)
+    ctx.save()
+    return new_checks
 
 
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str],
@@ -1663,6 +2053,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1680,9 +2071,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1930,23 +2319,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2175,6 +2556,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            if ctx.save_journal:
+                ctx.save_journal.changed_stored_data.add(args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
@@ -2243,6 +2626,16 @@ class ServerCommandProcessor(CommonCommandProcessor):
             self.output(get_status_string(self.ctx, team, tag))
         return True
 
+    def _cmd_outbound(self) -> bool:
+        """Show how many outgoing messages were combined into fewer frames by outbound batching"""
+        if not self.ctx.outbound_batch_ms:
+            self.output("Outbound batching is disabled.")
+            return False
+        messages, frames = self.ctx.outbound_counts["messages"], self.ctx.outbound_counts["frames"]
+        self.output(f"Sent {messages} outgoing messages as {frames} frames "
+                    f"({messages - frames} merged) with a {self.ctx.outbound_batch_ms}ms window.")
+        return True
+
     def _cmd_exit(self) -> bool:
         """Shutdown the server"""
         try:
@@ -2631,6 +3024,12 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--save_journal', default=defaults["save_journal"], action="store_true",
+                        help="Append only what changed to a journal next to the save file on each save, "
+                             "writing the full save only once the journal has grown large.")
+    parser.add_argument('--outbound_batch_ms', default=defaults["outbound_batch_ms"], type=int,
+                        help="Collect outgoing messages for this many milliseconds and send each client "
+                             "one combined frame. 0 to send right away.")
     args = parser.parse_args()
     return args
 
@@ -2677,7 +3076,8 @@ async def main(args: argparse.Namespace):
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
-                  args.auto_shutdown, args.compatibility, args.log_network)
+                  args.auto_shutdown, args.compatibility, args.log_network, save_journal=args.save_journal,
+                  outbound_batch_ms=args.outbound_batch_ms)
     data_filename = args.multidata
 
     if not data_filename:
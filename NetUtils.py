@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-from collections.abc import Mapping, Sequence
+from collections.abc import Mapping, MutableMapping, Sequence
 import typing
 import enum
+import pickle
+import struct
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, VersionException, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -510,6 +513,107 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_format_version = 4
+"""Format of .archipelago files written by `encode_multidata`. Versions up to 3 are a single zlib compressed pickle."""
+multidata_compression_level = 6
+_section_index_header = struct.Struct("<I")
+
+
+class LazyMultiData(MutableMapping[str, typing.Any]):
+    """
+    Multidata of format 4, where each top level key is a separately compressed section.
+    Sections are only decompressed and unpickled when first accessed, so readers only pay for the parts they use.
+    """
+    _data: memoryview
+    _index: dict[str, tuple[int, int]]
+    _decoded: dict[str, typing.Any]
+
+    def __init__(self, data: bytes) -> None:
+        view = memoryview(data)
+        index_length, = _section_index_header.unpack_from(view, 1)
+        index_start = 1 + _section_index_header.size
+        self._index = restricted_loads(view[index_start:index_start + index_length])
+        self._data = view[index_start + index_length:]
+        self._decoded = {}
+
+    def raw_section(self, key: str) -> bytes | None:
+        """The still compressed section of a key, if it was neither accessed nor changed since loading."""
+        if key in self._decoded or key not in self._index:
+            return None
+        offset, length = self._index[key]
+        return self._data[offset:offset + length].tobytes()
+
+    def section_loader(self, key: str, default: typing.Any = None) -> typing.Callable[[], typing.Any]:
+        """Defer decoding a section, without keeping this mapping or its other decoded sections alive."""
+        if key in self._decoded:
+            value = self._decoded[key]
+            return lambda: value
+        if key not in self._index:
+            return lambda: default
+        offset, length = self._index[key]
+        section = self._data[offset:offset + length]
+        return lambda: restricted_loads(zlib.decompress(section))
+
+    def __getitem__(self, key: str) -> typing.Any:
+        try:
+            return self._decoded[key]
+        except KeyError:
+            offset, length = self._index[key]
+            value = self._decoded[key] = restricted_loads(zlib.decompress(self._data[offset:offset + length]))
+            return value
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._decoded[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._decoded.pop(key, None)
+        self._index.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._decoded or key in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self._decoded
+        yield from (key for key in self._index if key not in self._decoded)
+
+    def __len__(self) -> int:
+        return len(self._decoded) + sum(1 for key in self._index if key not in self._decoded)
+
+
+def encode_multidata(multidata: Mapping[str, typing.Any],
+                     dumps: typing.Callable[[typing.Any], bytes] = pickle.dumps) -> bytes:
+    """
+    Encode multidata in the latest format: the format version, the length of the section index, the section index,
+    then each top level key as its own compressed pickle. Sections of a `LazyMultiData` that were never accessed are
+    copied without decompressing them.
+    """
+    index: dict[str, tuple[int, int]] = {}
+    sections: list[bytes] = []
+    offset = 0
+    for key in multidata:
+        section = multidata.raw_section(key) if isinstance(multidata, LazyMultiData) else None
+        if section is None:
+            section = zlib.compress(dumps(multidata[key]), multidata_compression_level)
+        index[key] = offset, len(section)
+        sections.append(section)
+        offset += len(section)
+    encoded_index = pickle.dumps(index)
+    return b"".join((bytes([multidata_format_version]), _section_index_header.pack(len(encoded_index)),
+                     encoded_index, *sections))
+
+
+def decode_multidata(data: bytes) -> MutableMapping[str, typing.Any]:
+    """Decode multidata of any supported format. Format 4 is decoded lazily, see `LazyMultiData`."""
+    format_version = data[0]
+    if format_version > multidata_format_version:
+        raise VersionException("Incompatible multidata.")
+    if format_version == 4:
+        return LazyMultiData(data)
+    return restricted_loads(zlib.decompress(data[1:]))
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -532,3 +636,8 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+    try:
+        from _speedups import encode, ObjectHook
+        decode = JSONDecoder(object_hook=ObjectHook(custom_hooks, allowlist)).decode
+    except ImportError:
+        pass  # keep the pure python encode and decode
@@ -11,10 +11,14 @@ import subprocess
 import sys
 import pickle
 import functools
+import inspect
 import io
 import collections
+import contextlib
 import importlib
 import logging
+import threading
+import time
 import warnings
 
 from argparse import Namespace
@@ -31,7 +35,7 @@ except ImportError:
 if typing.TYPE_CHECKING:
     import tkinter
     import pathlib
-    from BaseClasses import Region
+    from BaseClasses import MultiWorld, Region
     import multiprocessing
 
 
@@ -524,6 +528,13 @@ class KeyedDefaultDict(collections.defaultdict):
         return value
 
 
+class NonInsertingKeyedDefaultDict(KeyedDefaultDict):
+    """KeyedDefaultDict that does not store the values made for missing keys, so looking up keys never modifies it"""
+
+    def __missing__(self, key):
+        return self.default_factory(key)
+
+
 def get_text_between(text: str, start: str, end: str) -> str:
     return text[text.index(start) + len(start): text.rindex(end)]
 
@@ -1222,3 +1233,178 @@ class DaemonThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
             t.start()
             self._threads.add(t)
             # NOTE: don't add to _threads_queues so we don't block on shutdown
+
+
+class GenerationProfiler:
+    """
+    Structured profile of a single generation, enabled with `Generate.py --profile`.
+    Records wall time, cpu time and peak RSS growth of each stage, the time spent in each world's calls, and how often
+    states were swept or had their reachable regions updated, to be written as JSON next to the output.
+    """
+    active: typing.ClassVar[Optional[GenerationProfiler]] = None
+    """The profiler of the generation currently running, if it is being profiled. Checked by `AutoWorld._timed_call`."""
+
+    stages: typing.List[Dict[str, Any]]
+    world_calls: Dict[int, Dict[str, typing.List[float]]]
+    """player -> method name -> [wall time, cpu time]"""
+    stage_calls: Dict[str, Dict[str, typing.List[float]]]
+    """game -> stage method name -> [wall time, cpu time]"""
+    sweeps: int
+    reachable_region_updates: typing.Counter[int]
+    """player -> number of `CollectionState.update_reachable_regions` calls"""
+
+    def __init__(self) -> None:
+        self.stages = []
+        self.world_calls = collections.defaultdict(lambda: collections.defaultdict(lambda: [0.0, 0.0]))
+        self.stage_calls = collections.defaultdict(lambda: collections.defaultdict(lambda: [0.0, 0.0]))
+        self.sweeps = 0
+        self.reachable_region_updates = collections.Counter()
+        self._lock = threading.Lock()
+        self._originals: typing.List[typing.Tuple[object, str, Any]] = []
+        self._start = time.perf_counter()
+
+    @staticmethod
+    def peak_rss() -> Optional[int]:
+        """Peak resident set size of this process in bytes, or None where it can not be read."""
+        try:
+            import resource
+        except ImportError:  # Windows
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if is_macos else peak * 1024
+
+    def start(self) -> None:
+        """Make this the active profiler and start counting sweeps, reachable region updates and fill steps."""
+        from BaseClasses import CollectionState
+        import Fill
+
+        def count_sweeps(original: typing.Callable[..., Any]) -> typing.Callable[..., Any]:
+            @functools.wraps(original)
+            def sweep_for_advancements(state: CollectionState, *args: Any, **kwargs: Any) -> Any:
+                with self._lock:
+                    self.sweeps += 1
+                return original(state, *args, **kwargs)
+            return sweep_for_advancements
+
+        def count_updates(original: typing.Callable[..., Any]) -> typing.Callable[..., Any]:
+            @functools.wraps(original)
+            def update_reachable_regions(state: CollectionState, player: int) -> None:
+                with self._lock:
+                    self.reachable_region_updates[player] += 1
+                return original(state, player)
+            return update_reachable_regions
+
+        def fill_stage(original: typing.Callable[..., Any]) -> typing.Callable[..., Any]:
+            default_name = inspect.signature(original).parameters["name"].default
+
+            @functools.wraps(original)
+            def fill(*args: Any, **kwargs: Any) -> Any:
+                name = inspect.signature(original).bind(*args, **kwargs).arguments.get("name", default_name)
+                with self.stage(f"{original.__name__} {name}"):
+                    return original(*args, **kwargs)
+            return fill
+
+        for owner, attribute, wrap in ((CollectionState, "sweep_for_advancements", count_sweeps),
+                                       (CollectionState, "update_reachable_regions", count_updates),
+                                       (Fill, "fill_restrictive", fill_stage),
+                                       (Fill, "remaining_fill", fill_stage)):
+            original = getattr(owner, attribute)
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, wrap(original))
+        GenerationProfiler.active = self
+
+    def stop(self) -> None:
+        """Stop profiling and restore everything instrumented by `start`."""
+        if GenerationProfiler.active is self:
+            GenerationProfiler.active = None
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> typing.Iterator[None]:
+        """
+        Record a stage of generation. Stages may nest or run in other threads; stages on the main thread measure cpu
+        time of the whole process, while stages on other threads only measure their own thread.
+        """
+        main_thread = threading.current_thread() is threading.main_thread()
+        cpu_clock = time.process_time if main_thread else time.thread_time
+        rss = self.peak_rss()
+        with self._lock:
+            sweeps, updates = self.sweeps, sum(self.reachable_region_updates.values())
+        wall, cpu = time.perf_counter(), cpu_clock()
+        try:
+            yield
+        finally:
+            wall_end, cpu_end = time.perf_counter(), cpu_clock()
+            rss_end = self.peak_rss()
+            with self._lock:
+                self.stages.append({
+                    "name": name,
+                    "thread": threading.current_thread().name,
+                    "start": wall - self._start,
+                    "wall": wall_end - wall,
+                    "cpu": cpu_end - cpu,
+                    "peak_rss_delta": None if rss is None or rss_end is None else rss_end - rss,
+                    "sweeps": self.sweeps - sweeps,
+                    "reachable_region_updates": sum(self.reachable_region_updates.values()) - updates,
+                })
+
+    def wrap(self, name: str, function: typing.Callable[..., RetType]) -> typing.Callable[..., RetType]:
+        """Wrap a function so that each call of it is recorded as a stage, such as a task submitted to a pool."""
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> RetType:
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def record_call(self, player: Optional[int], game: str, method_name: str, wall: float, cpu: float) -> None:
+        """Record time spent in a world's method, or in a stage method of its world class if player is None."""
+        with self._lock:
+            times = self.world_calls[player][method_name] if player else self.stage_calls[game][method_name]
+            times[0] += wall
+            times[1] += cpu
+
+    def as_dict(self, multiworld: MultiWorld) -> Dict[str, Any]:
+        """The profile as JSON compatible data, grouping world calls by slot and by world class."""
+        games, names = multiworld.game, multiworld.player_name
+        slots: Dict[str, Dict[str, Any]] = {}
+        world_classes: Dict[str, Dict[str, Any]] = {}
+
+        def add_call(game: str, method_name: str, wall: float, cpu: float) -> None:
+            world_class = world_classes.setdefault(game, {"slots": 0, "wall": 0.0, "cpu": 0.0, "calls": {}})
+            world_class["wall"] += wall
+            world_class["cpu"] += cpu
+            call = world_class["calls"].setdefault(method_name, {"wall": 0.0, "cpu": 0.0})
+            call["wall"] += wall
+            call["cpu"] += cpu
+
+        for player, calls in sorted(self.world_calls.items()):
+            slot = slots[str(player)] = {
+                "name": names[player], "game": games[player], "wall": 0.0, "cpu": 0.0, "calls": {},
+                "reachable_region_updates": self.reachable_region_updates[player],
+            }
+            for method_name, (wall, cpu) in calls.items():
+                slot["wall"] += wall
+                slot["cpu"] += cpu
+                slot["calls"][method_name] = {"wall": wall, "cpu": cpu}
+                add_call(games[player], method_name, wall, cpu)
+            world_classes[games[player]]["slots"] += 1
+        for game, calls in self.stage_calls.items():
+            for method_name, (wall, cpu) in calls.items():
+                add_call(game, method_name, wall, cpu)
+        return {
+            "seed_name": multiworld.seed_name,
+            "version": __version__,
+            "wall": time.perf_counter() - self._start,
+            "peak_rss": self.peak_rss(),
+            "sweeps": self.sweeps,
+            "reachable_region_updates": sum(self.reachable_region_updates.values()),
+            "stages": self.stages,
+            "slots": slots,
+            "world_classes": world_classes,
+        }
+
+    def write(self, file_name: str, multiworld: MultiWorld) -> None:
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(multiworld), f, indent=1)
@@ -25,7 +25,11 @@ app.jinja_env.filters['get_file_safe_name'] = get_file_safe_name
 
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
+# fork generators from a fork server that already loaded the worlds, so they start right away. Not on Windows
+app.config["GENERATOR_PREFORK"] = False
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# fork all hosters from one parent that prepared the static server data, sharing it between them. Not on Windows
+app.config["HOSTER_PREFORK"] = False
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -38,10 +42,14 @@ app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 64 megabyte limit
 app.config["SECRET_KEY"] = bytes(socket.gethostname(), encoding="utf-8")
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
+# size in bytes from which an upload is queued to be processed by the generators, instead of during the request
+app.config["UPLOAD_JOB_THRESHOLD"] = 4 * 1024 * 1024
 # after what time in seconds should generation be aborted, freeing the queue slot. Can be set to None to disable.
 app.config["JOB_TIME"] = 600
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
+# generations estimated to cost this much (players + different games) or more only get up to half the generators
+app.config["LARGE_GENERATION_COST"] = 10
 app.config['SESSION_PERMANENT'] = True
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
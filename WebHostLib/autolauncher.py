@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import collections
 import json
 import logging
 import multiprocessing
+import shutil
+import tempfile
+import time
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -42,33 +46,23 @@ def _mp_gen_game(
     owner=None,
     sid=None,
     timeout: int|None = None,
+    output_dir: str | None = None,
 ) -> PrimaryKey | None:
     from setproctitle import setproctitle
 
     setproctitle(f"Generator ({sid})")
     try:
-        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
+        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout, output_dir=output_dir)
     finally:
         setproctitle(f"Generator (idle)")
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
+def launch_generator(scheduler: GenerationScheduler, generation: Generation) -> None:
     try:
         meta = json.loads(generation.meta)
-        options = restricted_loads(generation.options)
-        logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(
-            _mp_gen_game,
-            (options,),
-            {
-                "meta": meta,
-                "sid": generation.id,
-                "owner": generation.owner,
-                "timeout": timeout,
-            },
-            handle_generation_success,
-            handle_generation_failure,
-        )
+        # queued uploads hold the uploaded file instead of options
+        options = bytes(generation.options) if meta.get("upload") else restricted_loads(generation.options)
+        scheduler.submit(generation.id, options, meta, generation.owner)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
@@ -77,6 +71,190 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
         generation.state = STATE_STARTED
 
 
+def estimate_generation_cost(options: dict[str, dict[str, Any]]) -> int:
+    """Rough relative cost of generating: each player adds to it, and so does each different game, as each has
+    its own setup."""
+    return len(options) + len({str(player_options.get("game")) for player_options in options.values()})
+
+
+class GenerationJob(typing.NamedTuple):
+    sid: UUID
+    options: dict[str, dict[str, Any]] | bytes
+    meta: dict[str, Any]
+    owner: UUID
+    cost: int
+    large: bool
+    queued: float
+    """time.monotonic() of when the job was submitted."""
+
+
+def _run_generator(config: dict[str, Any], connection: multiprocessing.connection.Connection, max_jobs: int) -> None:
+    """Generator process, running the jobs (generations or uploads) it receives one at a time and replying with
+    their seed id or None. Generations write their output to the directory sent along with the job."""
+    init_generator(config)
+    for _ in range(max_jobs):
+        try:
+            sid, options, meta, owner, output_dir = connection.recv()
+        except EOFError:
+            return  # scheduler went away
+        try:
+            if meta.get("upload"):
+                seed_id = process_queued_upload(options, owner, sid)
+            else:
+                seed_id = _mp_gen_game(options, meta=meta, owner=owner, sid=sid, output_dir=output_dir)
+        except Exception as e:
+            handle_generation_failure(e)
+            seed_id = None
+        connection.send(seed_id)
+
+
+class GeneratorWorker:
+    """A generator process of the GenerationScheduler and the job it is running."""
+    max_jobs: typing.ClassVar[int] = 10
+    """Jobs a generator process runs before being replaced, to not hold on to memory they leave behind."""
+    process: multiprocessing.process.BaseProcess
+    connection: multiprocessing.connection.Connection
+    job: GenerationJob | None
+    output_dir: str | None
+    """Output directory of the running job, removed once the job finished or the generator was stopped, as a killed
+    generator can't clean up after itself."""
+    job_start: float
+    jobs_started: int
+
+    def __init__(self, mp_context: multiprocessing.context.BaseContext, config: dict[str, Any],
+                 target: typing.Callable[..., None]):
+        self.connection, child_connection = mp_context.Pipe()
+        self.process = mp_context.Process(target=target, args=(config, child_connection, self.max_jobs),
+                                          name="Generator", daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.job = None
+        self.output_dir = None
+        self.job_start = 0
+        self.jobs_started = 0
+
+    @property
+    def available(self) -> bool:
+        return self.job is None and self.jobs_started < self.max_jobs
+
+    def start_job(self, job: GenerationJob) -> None:
+        self.output_dir = tempfile.mkdtemp(prefix="generation_")
+        self.connection.send((job.sid, job.options, job.meta, job.owner, self.output_dir))
+        self.job = job
+        self.job_start = time.monotonic()
+        self.jobs_started += 1
+
+    def finish_job(self) -> None:
+        self.job = None
+        self.remove_output_dir()
+
+    def remove_output_dir(self) -> None:
+        if self.output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+    def stop(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.remove_output_dir()
+
+
+class GenerationScheduler:
+    """
+    Runs queued generations on a fixed number of generator processes.
+    Jobs are split by their estimated cost into a lane of small and one of large jobs. Large jobs only get up to
+    half of the generators, so small jobs don't wait behind them. A job running over the job time is cancelled by
+    killing its generator, which is replaced right away.
+    """
+    job_time: int | None
+    large_cost: int
+    large_workers: int
+    lanes: dict[bool, typing.Deque[GenerationJob]]
+    """Waiting jobs, by whether they are large."""
+    workers: list[GeneratorWorker]
+
+    def __init__(self, config: dict[str, Any], mp_context: multiprocessing.context.BaseContext,
+                 worker_target: typing.Callable[..., None] = _run_generator):
+        self.config = config
+        self.mp_context = mp_context
+        self.worker_target = worker_target
+        self.job_time = config["JOB_TIME"]
+        self.large_cost = config["LARGE_GENERATION_COST"]
+        self.large_workers = max(1, config["GENERATORS"] // 2)
+        self.lanes = {False: collections.deque(), True: collections.deque()}
+        self.workers = [self._start_worker() for _ in range(config["GENERATORS"])]
+
+    def _start_worker(self) -> GeneratorWorker:
+        return GeneratorWorker(self.mp_context, self.config, self.worker_target)
+
+    def submit(self, sid: UUID, options: dict[str, dict[str, Any]] | bytes, meta: dict[str, Any],
+               owner: UUID) -> None:
+        cost = 1 if meta.get("upload") else estimate_generation_cost(options)
+        self.lanes[cost >= self.large_cost].append(
+            GenerationJob(sid, options, meta, owner, cost, cost >= self.large_cost, time.monotonic()))
+
+    def next_job(self) -> GenerationJob | None:
+        """Takes the next job to run, from the large lane if it has a generator to spare, else the small lane."""
+        running_large = sum(worker.job is not None and worker.job.large for worker in self.workers)
+        if self.lanes[True] and running_large < self.large_workers:
+            return self.lanes[True].popleft()
+        if self.lanes[False]:
+            return self.lanes[False].popleft()
+        return None
+
+    @staticmethod
+    def _collect_result(worker: GeneratorWorker, now: float) -> None:
+        """Finishes the job of worker if its generator replied."""
+        job = worker.job
+        if job and worker.connection.poll():
+            try:
+                seed_id = worker.connection.recv()
+            except EOFError:
+                return  # exited without replying
+            worker.finish_job()
+            if seed_id:
+                handle_generation_success(seed_id)
+            logging.info(f"Generation {job.sid} with cost {job.cost} waited {worker.job_start - job.queued:.1f}"
+                         f" seconds in queue and ran for {now - worker.job_start:.1f} seconds.")
+
+    def update(self) -> None:
+        """Collects finished jobs, cancels timed out ones, replaces exited generators and starts waiting jobs."""
+        now = time.monotonic()
+        for index, worker in enumerate(self.workers):
+            self._collect_result(worker, now)
+            if worker.job and self.job_time is not None and now - worker.job_start > self.job_time:
+                logging.info(f"Generation {worker.job.sid} exceeded the job time, stopping it.")
+                worker.stop()
+                set_generation_error(worker.job.sid, generation_timeout_error +
+                                     f"Stopped after {self.job_time} seconds.")
+                self.workers[index] = self._start_worker()
+            elif not worker.process.is_alive():
+                # it may have replied after the poll above and then exited, for example after its last job
+                self._collect_result(worker, now)
+                worker.stop()
+                if worker.job:  # for example by running out of memory
+                    logging.error(f"Generator of {worker.job.sid} exited with {worker.process.exitcode}.")
+                    set_generation_error(worker.job.sid, "Generator process exited unexpectedly.")
+                self.workers[index] = self._start_worker()
+
+        for worker in self.workers:
+            if worker.available:
+                job = self.next_job()
+                if not job:
+                    break
+                if job.meta.get("upload"):
+                    logging.info(f"Processing upload {job.sid}.")
+                else:
+                    logging.info(f"Generating {job.sid} for {len(job.options)} players, "
+                                 f"in the {'large' if job.large else 'small'} lane.")
+                worker.start_job(job)
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+
+
 def init_generator(config: dict[str, Any]) -> None:
     from setproctitle import setproctitle
 
@@ -119,21 +297,18 @@ def autohost(config: dict):
         try:
             with Locker("autohost"):
                 cleanup()
-                hosters = []
-                for x in range(config["HOSTERS"]):
-                    hoster = MultiworldInstance(config, x)
-                    hosters.append(hoster)
-                    hoster.start()
-
+                hosters = [MultiworldInstance(config, x) for x in range(config["HOSTERS"])]
+                if config["HOSTER_PREFORK"] and "fork" in multiprocessing.get_all_start_methods():
+                    start_forked_hosters(config, hosters)
+                else:
+                    if config["HOSTER_PREFORK"]:
+                        logging.warning("Hoster pre-fork is not supported on this platform, starting them one by one.")
+                    for hoster in hosters:
+                        hoster.start()
+
+                scheduler = RoomScheduler(hosters)
                 while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                    scheduler.update()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -147,9 +322,17 @@ def autogen(config: dict):
         try:
             with Locker("autogen"):
 
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
-                    job_time = config["JOB_TIME"]
+                if config["GENERATOR_PREFORK"] and "forkserver" in multiprocessing.get_all_start_methods():
+                    mp_context = multiprocessing.get_context("forkserver")
+                    # the fork server imports the worlds once, then forks every generator from that,
+                    # which makes replacing them cheap
+                    mp_context.set_forkserver_preload(["WebHostLib.generatorpreload"])
+                else:
+                    if config["GENERATOR_PREFORK"]:
+                        logging.warning("Generator pre-fork is not supported on this platform, spawning generators.")
+                    mp_context = multiprocessing.get_context()
+                scheduler = GenerationScheduler(config, mp_context)
+                try:
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -160,7 +343,7 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
+                                    launch_generator(scheduler, generation)
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
@@ -172,7 +355,10 @@ def autogen(config: dict):
                                 generation for generation in Generation
                                 if generation.state == STATE_QUEUED).for_update()
                             for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                                launch_generator(scheduler, generation)
+                        scheduler.update()
+                finally:
+                    scheduler.stop()
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -187,6 +373,7 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.save_journal = save_journal_enabled()
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
@@ -198,14 +385,21 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.save_journal),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def collect_shut_down_rooms(self) -> typing.List[UUID]:
+        """Returns the rooms that shut down since the last call, which may have to be started again."""
+        room_ids = []
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.remove(room_id)
+            room_ids.append(room_id)
+        return room_ids
+
+    def start_room(self, room_id):
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -225,6 +419,70 @@ class MultiworldInstance():
         self.process = None
 
 
+class RoomScheduler:
+    """
+    Starts rooms on their hosters when they see activity.
+    Instead of checking every recently active room each update, this only looks at rooms with activity since the
+    previous update and rooms that just shut down, with a check of all recently active rooms every
+    full_check_interval to catch anything missed.
+    """
+    activity_overlap: typing.ClassVar[timedelta] = timedelta(seconds=10)
+    """Overlap of the activity checks, so activity committed shortly after being timestamped is not missed."""
+    full_check_interval: typing.ClassVar[timedelta] = timedelta(minutes=1)
+    hosters: typing.Sequence[MultiworldInstance]
+    last_check: typing.Optional[datetime]
+    last_full_check: typing.Optional[datetime]
+
+    def __init__(self, hosters: typing.Sequence[MultiworldInstance]):
+        self.hosters = hosters
+        self.last_check = None
+        self.last_full_check = None
+
+    def start_if_active(self, room: Room, now: datetime) -> None:
+        # the per-room timeout can't currently be PonyORM transpiled, so this is filtered here
+        if room.last_activity >= now - timedelta(seconds=room.timeout + 5):
+            self.hosters[room.id.int % len(self.hosters)].start_room(room.id)
+
+    @db_session
+    def update(self) -> None:
+        now = datetime.utcnow()
+        # a room that shut down may have seen activity while doing so, in which case it has to start again
+        shut_down = [room_id for hoster in self.hosters for room_id in hoster.collect_shut_down_rooms()]
+        if self.last_full_check is None or now - self.last_full_check >= self.full_check_interval:
+            self.last_full_check = now
+            since = now - timedelta(days=3)
+        else:
+            since = self.last_check - self.activity_overlap
+        self.last_check = now
+
+        for room in select(room for room in Room if room.last_activity >= since):
+            self.start_if_active(room, now)
+        if shut_down:
+            for room in select(room for room in Room if room.id in shut_down and room.last_activity < since):
+                self.start_if_active(room, now)
+
+
+def save_journal_enabled() -> bool:
+    """Whether rooms journal their saves, from the save_journal server option in host.yaml."""
+    from settings import get_settings
+
+    return bool(get_settings().server_options.save_journal)
+
+
+def start_forked_hosters(config: dict, hosters: typing.List[MultiworldInstance]) -> None:
+    """Starts one parent process, which forks all hosters so that they share the static server data."""
+    process = multiprocessing.Process(group=None, target=run_forked_server_processes,
+                                      args=([(hoster.name, hoster.rooms_to_start, hoster.rooms_shutting_down)
+                                             for hoster in hosters],
+                                            config["PONY"], get_static_server_data(), config["SELFLAUNCHCERT"],
+                                            config["SELFLAUNCHKEY"], config["HOST_ADDRESS"], save_journal_enabled()),
+                                      name="MultiHosterParent")
+    process.start()
+    for hoster in hosters:
+        hoster.process = process  # stopping any hoster stops all of them
+
+
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
-from .generate import gen_game
+from .customserver import run_forked_server_processes, run_server_process, get_static_server_data
+from .generate import gen_game, generation_timeout_error, set_generation_error
+from .upload import process_queued_upload
@@ -21,11 +21,11 @@ import Utils
 
 from MultiServer import (
     Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
-    server_per_message_deflate_factory,
+    server_per_message_deflate_factory, build_game_tables, SaveJournal,
 )
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, SaveJournalRecord, TrackerSummary, db, get_save_journal
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -60,20 +60,64 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+class CommandDispatcher(threading.Thread):
+    """
+    Polls the database for commands to all rooms of this hoster process at once
+    and hands them to the event loop of the room they are for.
+    """
+    interval: float = 1
+    processors: typing.Dict[int, DBCommandProcessor]
+
+    def __init__(self):
+        super().__init__(name="CommandDispatcher", daemon=True)
+        self.processors = {}
+
+    def add_room(self, ctx: WebHostContext):
+        self.processors[ctx.room_id] = DBCommandProcessor(ctx)
+
+    def remove_room(self, room_id: int):
+        self.processors.pop(room_id, None)
+
+    def dispatch(self):
+        room_ids = list(self.processors)
+        if not room_ids:
+            return
+        with db_session:
+            commands = select(command for command in Command if command.room.id in room_ids)
+            for command in commands:
+                cmdprocessor = self.processors.get(command.room.id)
+                if cmdprocessor:  # room may have shut down since
+                    cmdprocessor.ctx.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
+                command.delete()
+            commit()
+
+    def run(self):
+        while 1:
+            try:
+                self.dispatch()
+            except Exception as e:
+                # keep dispatching for the other rooms, a database hiccup should not cut all of them off
+                logging.exception(e)
+            time.sleep(self.interval)
+
+
 class WebHostContext(Context):
     room_id: int
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
+    def __init__(self, static_server_data: dict, logger: logging.Logger, save_journal: bool = False):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
         super(WebHostContext, self).__init__("", 0, "", "", 1,
                                              40, True, "enabled", "enabled",
-                                             "enabled", 0, 2, logger=logger)
+                                             "enabled", 0, 2, logger=logger, save_journal=save_journal)
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        # received items already counted into the tracker summary, as their lists only ever get appended to
+        self.tracker_received_counts: typing.Dict[typing.Tuple[int, int], typing.Dict[int, int]] = {}
+        self.tracker_received_counted: typing.Dict[typing.Tuple[int, int], int] = {}
 
     def __del__(self):
         try:
@@ -89,20 +133,6 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            del commands
-            time.sleep(5)
-
     @db_session
     def load(self, room_id: int):
         self.room_id = room_id
@@ -154,22 +184,65 @@ class WebHostContext(Context):
         self.saving = enabled
         if self.saving:
             with db_session:
-                savegame_data = Room.get(id=self.room_id).multisave
+                room = Room.get(id=self.room_id)
+                savegame_data = room.multisave
                 if savegame_data:
-                    self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                    if self.save_journal:
+                        self.set_save(self.save_journal.load(restricted_loads(savegame_data), len(savegame_data),
+                                                             get_save_journal(room)))
+                    else:
+                        # records left from hosting with journaling on are dropped by the next save
+                        self.set_save(SaveJournal.replay(restricted_loads(savegame_data), get_save_journal(room)))
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-        room.multisave = pickle.dumps(self.get_save())
+        self._store_save(self.get_save(), exit_save)
+        summary = pickle.dumps(self.get_tracker_summary())
+        if room.tracker_summary:
+            room.tracker_summary.data = summary
+        else:
+            TrackerSummary(room=room, data=summary)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
         return True
 
+    def get_tracker_summary(self) -> dict:
+        """
+        Per slot counts of checked locations and received items, client status and last activity,
+        so trackers don't have to decode and count through the whole save.
+        """
+        for (team, slot, remote), items in self.received_items.items():
+            if not remote:
+                continue
+            counted = self.tracker_received_counted.get((team, slot), 0)
+            if counted > len(items):  # replaced since, start over
+                counted = 0
+                del self.tracker_received_counts[team, slot]
+            counts = self.tracker_received_counts.setdefault((team, slot), {})
+            for item in items[counted:]:
+                counts[item.item] = counts.get(item.item, 0) + 1
+            self.tracker_received_counted[team, slot] = len(items)
+        return {
+            "checked": {team_slot: len(locations) for team_slot, locations in self.location_checks.items()},
+            "received": self.tracker_received_counts,
+            "client_game_state": {team_slot: int(state) for team_slot, state in self.client_game_state.items()},
+            "client_activity_timers": tuple(
+                (team_slot, value.timestamp()) for team_slot, value in self.client_activity_timers.items()),
+        }
+
+    def _write_save_snapshot(self, save: dict) -> int:
+        room = Room.get(id=self.room_id)
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        room.multisave = pickle.dumps(save)
+        select(record for record in SaveJournalRecord if record.room == room).delete(bulk=True)
+        return len(room.multisave)
+
+    def _append_save_journal(self, record: bytes) -> None:
+        SaveJournalRecord(room=Room.get(id=self.room_id), data=record)
+
     def get_save(self) -> dict:
         d = super(WebHostContext, self).get_save()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
@@ -209,6 +282,18 @@ def get_static_server_data() -> dict:
     return data
 
 
+def prepare_static_server_data(static_server_data: dict) -> dict:
+    """Adds the name lookup tables of all static games, built once for every room of the process to share."""
+    if "prepared_game_tables" in static_server_data:
+        return static_server_data
+    return {
+        **static_server_data,
+        "prepared_game_tables": build_game_tables(static_server_data["gamespackage"],
+                                                  static_server_data["item_name_groups"],
+                                                  static_server_data["location_name_groups"]),
+    }
+
+
 def set_up_logging(room_id) -> logging.Logger:
     import os
     # logger setup
@@ -231,7 +316,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       save_journal: bool = False):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -272,17 +358,21 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
             return ssl_context
 
     del ponyconfig
+    static_server_data = prepare_static_server_data(static_server_data)
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    command_dispatcher = CommandDispatcher()
+    command_dispatcher.start()
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(static_server_data, logger, save_journal)
                 ctx.load(room_id)
                 ctx.init_save()
+                command_dispatcher.add_room(ctx)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -339,6 +429,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
+                command_dispatcher.remove_room(room_id)
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
@@ -386,3 +477,41 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
             save: typing.Optional[typing.Callable[[], typing.Any]] = getattr(task, "save", None)
             if save:
                 save()
+
+
+def run_forked_server_processes(hosters: typing.Sequence[typing.Tuple[str, multiprocessing.Queue, multiprocessing.Queue]],
+                                ponyconfig: dict, static_server_data: dict,
+                                cert_file: typing.Optional[str], cert_key_file: typing.Optional[str], host: str,
+                                save_journal: bool = False):
+    """
+    Pre-fork mode of the hosters: prepares the static server data once, then forks a run_server_process per
+    (name, rooms_to_run, rooms_shutting_down) of hosters, which share that data copy-on-write.
+    """
+    import gc
+    import signal
+    from setproctitle import setproctitle
+
+    setproctitle("MultiHosterParent")
+    Utils.init_logging("MultiHosterParent")
+    if "worlds" in sys.modules:
+        raise Exception("Worlds system should not be loaded in the custom server.")
+
+    static_server_data = prepare_static_server_data(static_server_data)
+    gc.collect()
+    # move everything into the permanent generation, so collections in the hosters don't touch
+    # (and thereby copy) the shared objects
+    gc.freeze()
+    # exit through sys.exit on terminate, so multiprocessing terminates the daemonic hosters with us
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    fork_context = multiprocessing.get_context("fork")
+    processes = []
+    for name, rooms_to_run, rooms_shutting_down in hosters:
+        process = fork_context.Process(target=run_server_process,
+                                       args=(name, ponyconfig, static_server_data, cert_file, cert_key_file, host,
+                                             rooms_to_run, rooms_shutting_down, save_journal),
+                                       name=name, daemon=True)
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
@@ -118,7 +118,9 @@ def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
         return redirect(url_for("view_seed", seed=seed_id))
 
 
-def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None, sid=None, timeout: int|None = None):
+def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None, sid=None, timeout: int|None = None,
+             output_dir: str | None = None):
+    """Generates and uploads a multiworld, writing the output to output_dir, or to a temporary directory if None."""
     if meta is None:
         meta = {}
 
@@ -126,7 +128,8 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
     race = meta.setdefault("generator_options", {}).setdefault("race", False)
 
     def task():
-        target = tempfile.TemporaryDirectory()
+        target = tempfile.TemporaryDirectory() if output_dir is None else None
+        target_dir = output_dir if target is None else target.name
         playercount = len(gen_options)
         seed = get_seed()
 
@@ -144,7 +147,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         args.spoiler = meta["generator_options"].get("spoiler", 0)
         args.race = race
         args.outputname = seedname
-        args.outputpath = target.name
+        args.outputpath = target_dir
         args.teams = 1
         args.plando_options = PlandoOptions.from_set(meta.setdefault("plando_options",
                                                                      {"bosses", "items", "connections", "texts"}))
@@ -152,6 +155,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         args.skip_output = False
         args.spoiler_only = False
         args.csv_output = False
+        args.profile = False
         args.sprite = dict.fromkeys(range(1, args.multi+1), None)
         args.sprite_pool = dict.fromkeys(range(1, args.multi+1), None)
 
@@ -171,7 +175,7 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
             raise Exception(f"Names have to be unique. Names: {Counter(args.name.values())}")
         ERmain(args, seed, baked_server_options=meta["server_options"])
 
-        return upload_to_db(target.name, sid, owner, race)
+        return upload_to_db(target_dir, sid, owner, race)
 
     thread_pool = DaemonThreadPoolExecutor(max_workers=1)
     thread = thread_pool.submit(task)
@@ -180,37 +184,36 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         return thread.result(timeout)
     except concurrent.futures.TimeoutError as e:
         if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = ("Allowed time for Generation exceeded, " +
-                                     "please consider generating locally instead. " +
-                                     format_exception(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
+            set_generation_error(sid, generation_timeout_error + format_exception(e))
     except (KeyboardInterrupt, SystemExit):
         # don't update db, retry next time
         raise
     except BaseException as e:
         if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = format_exception(e)
-                    gen.meta = json.dumps(meta)
-                    commit()
+            set_generation_error(sid, format_exception(e))
         raise
     finally:
         # free resources claimed by thread pool, if possible
         # NOTE: Timeout depends on the process being killed at some point
-        #       since we can't actually cancel a running gen at the moment.
+        #       since we can't actually cancel a running gen in this thread. autogen kills timed out gens instead.
         thread_pool.shutdown(wait=False, cancel_futures=True)
 
 
+generation_timeout_error = "Allowed time for Generation exceeded, please consider generating locally instead. "
+
+
+def set_generation_error(sid: UUID, error: str) -> None:
+    """Mark a queued Generation as failed with error, to be shown on its wait page."""
+    with db_session:
+        gen = Generation.get(id=sid)
+        if gen is not None:
+            gen.state = STATE_ERROR
+            meta = json.loads(gen.meta)
+            meta["error"] = error
+            gen.meta = json.dumps(meta)
+            commit()
+
+
 @app.route('/wait/<suuid:seed>')
 def wait_seed(seed: UUID):
     seed_id = seed
@@ -234,13 +237,9 @@ def upload_to_db(folder, sid, owner, race):
         if file.endswith(".zip"):
             with db_session:
                 with zipfile.ZipFile(file) as zfile:
-                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid)
-                if type(res) == "str":
-                    raise Exception(res)
-                elif res:
-                    seed = res
-                    gen = Generation.get(id=seed.id)
-                    if gen is not None:
-                        gen.delete()
-                    return seed.id
+                    seed = upload_zip_to_db(zfile, owner, {"race": race}, sid)
+                gen = Generation.get(id=seed.id)
+                if gen is not None:
+                    gen.delete()
+                return seed.id
     raise Exception("Generation zipfile not found.")
@@ -0,0 +1,13 @@
+"""
+Imported by the generator fork server when GENERATOR_PREFORK is enabled, see autolauncher.autogen.
+Every generator is forked from the fork server, so they all start with the worlds and the data package loaded.
+"""
+import gc
+
+import worlds  # noqa: F401 # builds network_data_package on import
+from . import autolauncher  # noqa: F401 # imports everything gen_game needs
+
+# move everything loaded so far into the permanent generation, so collections in the generators don't touch
+# (and thereby copy) the shared objects
+gc.collect()
+gc.freeze()
@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr, select
 
 db = Database()
 
@@ -26,6 +26,8 @@ class Room(db.Entity):
     commands = Set('Command')
     seed = Required('Seed', index=True)
     multisave = Optional(buffer, lazy=True)
+    save_journal = Set('SaveJournalRecord')
+    tracker_summary = Optional('TrackerSummary', cascade_delete=True)
     show_spoiler = Required(int, default=0)  # 0 -> never, 1 -> after completion, -> 2 always
     timeout = Required(int, default=lambda: 2 * 60 * 60)  # seconds since last activity to shutdown
     tracker = Optional(UUID, index=True)
@@ -44,6 +46,19 @@ class Seed(db.Entity):
     meta = Required(LongStr, default=lambda: "{\"race\": false}")  # additional meta information/tags
 
 
+class SaveJournalRecord(db.Entity):
+    """Changes to a room's multisave since it was last written, see MultiServer.SaveJournal"""
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    data = Required(bytes)
+
+
+class TrackerSummary(db.Entity):
+    """Counts shown by the trackers of a room, written along with its multisave, see WebHostContext"""
+    room = PrimaryKey(Room)
+    data = Required(bytes)
+
+
 class Command(db.Entity):
     id = PrimaryKey(int, auto=True)
     room = Required(Room)
@@ -61,3 +76,9 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+def get_save_journal(room: Room) -> list[bytes]:
+    """The journal records of a room's multisave, in the order they were written."""
+    return [record.data for record in
+            select(record for record in SaveJournalRecord if record.room == room).order_by(SaveJournalRecord.id)]
@@ -1,21 +1,25 @@
 import datetime
 import collections
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from functools import cached_property
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
 from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
-from MultiServer import Context, get_saving_second
+from MultiServer import Context, SaveJournal, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
-from Utils import restricted_loads, KeyedDefaultDict
+from Utils import restricted_loads, NonInsertingKeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, get_save_journal
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Decoded seeds, game data packages and saves are each kept between requests up to this many bytes of encoded data.
+TRACKER_DECODED_CACHE_BYTES = 64 * 1024 * 1024
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -23,6 +27,109 @@ _player_trackers: Dict[str, Callable] = {}
 TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
 
+_DecodedType = TypeVar("_DecodedType")
+
+
+class DecodedCache(Generic[_DecodedType]):
+    """A least recently used cache of decoded data shared between requests, bounded by the size of the encoded data.
+    The decoded data is shared, so it must not be modified.
+    """
+    max_size: int
+    size: int
+    _entries: "collections.OrderedDict[Hashable, Tuple[Any, int, _DecodedType]]"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any, load: Callable[[], Tuple[int, _DecodedType]]) -> _DecodedType:
+        """Returns the decoded data of key, calling load for its encoded size and decoded data
+        if it is not cached or was cached for a different version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[2]
+        size, decoded = load()  # decoding can take a while, so other requests are not held up by it
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry:
+                self.size -= old_entry[1]
+            if size <= self.max_size:
+                self._entries[key] = version, size, decoded
+                self.size += size
+                while self.size > self.max_size:
+                    self.size -= self._entries.popitem(last=False)[1][1]
+        return decoded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+@dataclass
+class SeedLookups:
+    """Decoded multidata of a seed and the name lookups of its games."""
+    multidata: Dict[str, Any]
+    item_id_to_name: Dict[str, Dict[int, str]]
+    location_id_to_name: Dict[str, Dict[int, str]]
+    item_name_to_id: Dict[str, Dict[str, int]]
+    location_name_to_id: Dict[str, Dict[str, int]]
+
+
+_game_package_lookups: DecodedCache[Tuple[Dict[int, str], Dict[int, str], Dict[str, int], Dict[str, int]]] = \
+    DecodedCache(TRACKER_DECODED_CACHE_BYTES)
+_seed_lookups: DecodedCache[SeedLookups] = DecodedCache(TRACKER_DECODED_CACHE_BYTES)
+_multisaves: DecodedCache[Dict[str, Any]] = DecodedCache(TRACKER_DECODED_CACHE_BYTES)
+
+
+def _load_game_package_lookups(checksum: str) \
+        -> Tuple[int, Tuple[Dict[int, str], Dict[int, str], Dict[str, int], Dict[str, int]]]:
+    data = GameDataPackage.get(checksum=checksum).data
+    game_package = restricted_loads(data)
+    return len(data), (
+        NonInsertingKeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+            id: name for name, id in game_package["item_name_to_id"].items()}),
+        NonInsertingKeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+            id: name for name, id in game_package["location_name_to_id"].items()}),
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+    )
+
+
+def _load_seed_lookups(room: Room) -> Tuple[int, SeedLookups]:
+    # the lookups are shared between requests and threads, so looking up unknown games or ids must not add them
+    multidata = Context.decompress(room.seed.multidata)
+    # Generate inverse lookup tables from data package, useful for trackers.
+    seed_lookups = SeedLookups(
+        multidata,
+        NonInsertingKeyedDefaultDict(lambda game_name: {
+            game_name: NonInsertingKeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
+        }),
+        NonInsertingKeyedDefaultDict(lambda game_name: {
+            game_name: NonInsertingKeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
+        }),
+        {},
+        {},
+    )
+    for game, game_package in multidata["datapackage"].items():
+        checksum = game_package["checksum"]
+        (seed_lookups.item_id_to_name[game], seed_lookups.location_id_to_name[game],
+         seed_lookups.item_name_to_id[game], seed_lookups.location_name_to_id[game]) = \
+            _game_package_lookups.get(checksum, None, lambda: _load_game_package_lookups(checksum))
+    return len(room.seed.multidata), seed_lookups
+
+
+def _load_multisave(room: Room) -> Tuple[int, Dict[str, Any]]:
+    if not room.multisave:
+        return 0, {}
+    journal = get_save_journal(room)
+    return (len(room.multisave) + sum(len(record) for record in journal),
+            SaveJournal.replay(restricted_loads(room.multisave), journal))
+
 
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
@@ -49,36 +156,28 @@ class TrackerData:
     """
     room: Room
     _multidata: Dict[str, Any]
-    _multisave: Dict[str, Any]
+    _summary: Optional[Dict[str, Any]]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        # seeds don't change and saves only change with room activity, so both can be kept between requests
+        seed_lookups = _seed_lookups.get(room.seed.id, None, lambda: _load_seed_lookups(room))
+        self._multidata = seed_lookups.multidata
+        # counts written by the room along with its save, so they are as recent as the save itself
+        self._summary = restricted_loads(room.tracker_summary.data) if room.tracker_summary else None
         self._tracker_cache = {}
 
-        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
-        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
+        self.item_id_to_name = seed_lookups.item_id_to_name
+        self.location_id_to_name = seed_lookups.location_id_to_name
+        self.item_name_to_id = seed_lookups.item_name_to_id
+        self.location_name_to_id = seed_lookups.location_name_to_id
 
-        # Generate inverse lookup tables from data package, useful for trackers.
-        self.item_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
-        })
-        self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
-        })
-        for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
-
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+    @cached_property
+    def _multisave(self) -> Dict[str, Any]:
+        """The room's multisave, only decoded when something is needed that is not in the tracker summary."""
+        return _multisaves.get(self.room.id, self.room.last_activity, lambda: _load_multisave(self.room))
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -112,6 +211,12 @@ class TrackerData:
         """Retrieves the set of all locations marked complete by this player."""
         return self._multisave.get("location_checks", {}).get((team, player), set())
 
+    def get_player_checked_count(self, team: int, player: int) -> int:
+        """Retrieves the number of locations marked complete by this player."""
+        if self._summary is not None:
+            return self._summary["checked"].get((team, player), 0)
+        return len(self.get_player_checked_locations(team, player))
+
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
@@ -124,11 +229,13 @@ class TrackerData:
     @_cache_results
     def get_player_inventory_counts(self, team: int, player: int) -> collections.Counter:
         """Retrieves a dictionary of all items received by their id and their received count."""
-        received_items = self.get_player_received_items(team, player)
         starting_items = self.get_player_starting_inventory(player)
-        inventory = collections.Counter()
-        for item in received_items:
-            inventory[item.item] += 1
+        if self._summary is not None:
+            inventory = collections.Counter(self._summary["received"].get((team, player), {}))
+        else:
+            inventory = collections.Counter()
+            for item in self.get_player_received_items(team, player):
+                inventory[item.item] += 1
         for item in starting_items:
             inventory[item] += 1
 
@@ -148,6 +255,8 @@ class TrackerData:
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
+        if self._summary is not None:
+            return ClientStatus(self._summary["client_game_state"].get((team, player), ClientStatus.CLIENT_UNKNOWN))
         return self._multisave.get("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
 
     def get_player_alias(self, team: int, player: int) -> Optional[str]:
@@ -186,7 +295,7 @@ class TrackerData:
     def get_team_locations_checked_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of checked player locations each team has."""
         return {
-            team: sum(len(self.get_player_checked_locations(team, player)) for player in players)
+            team: sum(self.get_player_checked_count(team, player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -241,7 +350,7 @@ class TrackerData:
     def get_room_locations_complete(self) -> Dict[TeamPlayer, int]:
         """Retrieves a dictionary of all locations complete per player."""
         return {
-            (team, player): len(self.get_player_checked_locations(team, player))
+            (team, player): self.get_player_checked_count(team, player)
             for team, players in self.get_all_players().items() for player in players
         }
 
@@ -274,7 +383,8 @@ class TrackerData:
         """
         last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = datetime.datetime.utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
+        source = self._multisave if self._summary is None else self._summary
+        for (team, player), timestamp in source.get("client_activity_timers", []):
             last_activity[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
 
         return last_activity
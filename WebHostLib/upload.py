@@ -1,24 +1,24 @@
 import json
+import os
 import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
 from markupsafe import Markup
-from pony.orm import commit, flush, select, rollback
+from pony.orm import commit, db_session, flush, select, rollback
 from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import GamesPackage, SlotType
+from NetUtils import GamesPackage, LazyMultiData, SlotType, encode_multidata
 from Utils import VersionException, __version__
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
-from .models import Seed, Room, Slot, GameDataPackage
+from .models import Generation, STATE_QUEUED, Seed, Room, Slot, GameDataPackage
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
 allowed_options_extensions = (".yaml", ".json", ".yml", ".txt", ".zip")
@@ -34,6 +34,18 @@ games_package_schema = schema.Schema({
 })
 
 
+class UploadError(Exception):
+    """An upload that can't be stored, with the message to show for it, which may be Markup."""
+    message: str
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message.striptags() if isinstance(self.message, Markup) else self.message
+
+
 def allowed_options(filename: str) -> bool:
     return filename.endswith(allowed_options_extensions)
 
@@ -50,58 +62,76 @@ def process_multidata(compressed_multidata, files={}):
     game_data: GamesPackage
 
     decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
+    if isinstance(decompressed_multidata, LazyMultiData):
+        # decode sections without keeping them decoded, so they are copied over as uploaded if not changed
+        def get_section(key: str) -> typing.Any:
+            return decompressed_multidata.section_loader(key, {})()
+    else:
+        def get_section(key: str) -> typing.Any:
+            return decompressed_multidata.get(key, {})
 
     slots: typing.Set[Slot] = set()
-    if "datapackage" in decompressed_multidata:
-        # strip datapackage from multidata, leaving only the checksums
-        game_data_packages: typing.List[GameDataPackage] = []
-        for game, game_data in decompressed_multidata["datapackage"].items():
-            if game_data.get("checksum"):
-                original_checksum = game_data.pop("checksum")
-                game_data = games_package_schema.validate(game_data)
-                game_data = {key: value for key, value in sorted(game_data.items())}
-                game_data["checksum"] = data_package_checksum(game_data)
-                if original_checksum != game_data["checksum"]:
-                    raise Exception(f"Original checksum {original_checksum} != "
-                                    f"calculated checksum {game_data['checksum']} "
-                                    f"for game {game}.")
-
-                game_data_package = GameDataPackage(checksum=game_data["checksum"],
-                                                    data=pickle.dumps(game_data))
-                decompressed_multidata["datapackage"][game] = {
-                    "version": game_data.get("version", 0),
-                    "checksum": game_data["checksum"],
-                }
-                try:
-                    commit()  # commit game data package
-                    game_data_packages.append(game_data_package)
-                except TransactionIntegrityError:
-                    del game_data_package
-                    rollback()
-
-    if "slot_info" in decompressed_multidata:
-        for slot, slot_info in decompressed_multidata["slot_info"].items():
-            # Ignore Player Groups (e.g. item links)
-            if slot_info.type == SlotType.group:
-                continue
-            slots.add(Slot(data=files.get(slot, None),
-                           player_name=slot_info.name,
-                           player_id=slot,
-                           game=slot_info.game))
-        flush()  # commit slots
-
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    datapackage = get_section("datapackage")
+    datapackage_changed = False
+    # strip datapackage from multidata, leaving only the checksums
+    game_data_packages: typing.List[GameDataPackage] = []
+    for game, game_data in datapackage.items():
+        if game_data.get("checksum") and not set(game_data) - {"version", "checksum"}:
+            # already stripped, which is only valid for data packages already known
+            if not GameDataPackage.exists(checksum=game_data["checksum"]):
+                raise UploadError(f"Unknown data package checksum {game_data['checksum']} for game {game}.")
+        elif game_data.get("checksum"):
+            original_checksum = game_data.pop("checksum")
+            game_data = games_package_schema.validate(game_data)
+            game_data = {key: value for key, value in sorted(game_data.items())}
+            game_data["checksum"] = data_package_checksum(game_data)
+            if original_checksum != game_data["checksum"]:
+                raise UploadError(f"Original checksum {original_checksum} != "
+                                f"calculated checksum {game_data['checksum']} "
+                                f"for game {game}.")
+
+            game_data_package = GameDataPackage(checksum=game_data["checksum"],
+                                                data=pickle.dumps(game_data))
+            datapackage[game] = {
+                "version": game_data.get("version", 0),
+                "checksum": game_data["checksum"],
+            }
+            datapackage_changed = True
+            try:
+                commit()  # commit game data package
+                game_data_packages.append(game_data_package)
+            except TransactionIntegrityError:
+                del game_data_package
+                rollback()
+    if datapackage_changed:
+        decompressed_multidata["datapackage"] = datapackage
+
+    for slot, slot_info in get_section("slot_info").items():
+        # Ignore Player Groups (e.g. item links)
+        if slot_info.type == SlotType.group:
+            continue
+        slots.add(Slot(data=files.get(slot, None),
+                       player_name=slot_info.name,
+                       player_id=slot,
+                       game=slot_info.game))
+    flush()  # commit slots
+
+    if isinstance(decompressed_multidata, LazyMultiData) and not datapackage_changed:
+        # already only holds checksums, nothing to re-encode
+        return slots, compressed_multidata
+    # sections that were not touched are copied over still compressed
+    compressed_multidata = encode_multidata(decompressed_multidata)
     return slots, compressed_multidata
 
 
-def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None):
+def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, sid=None) -> Seed:
+    """Stores the multiworld in zfile as a Seed, raising UploadError if it can't be."""
     if not owner:
         owner = session["_id"]
     infolist = zfile.infolist()
     if all(allowed_options(file.filename) or file.is_dir() for file in infolist):
-        flash(Markup("Error: Your .zip file only contains options files. "
-                     'Did you mean to <a href="/generate">generate a game</a>?'))
-        return
+        raise UploadError(Markup("Error: Your .zip file only contains options files. "
+                                 'Did you mean to <a href="/generate">generate a game</a>?'))
 
     spoiler = ""
     files = {}
@@ -111,8 +141,8 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
     for file in infolist:
         handler = AutoPatchRegister.get_handler(file.filename)
         if banned_file(file.filename):
-            return "Uploaded data contained a rom file, which is likely to contain copyrighted material. " \
-                   "Your file was deleted."
+            raise UploadError("Uploaded data contained a rom file, which is likely to contain copyrighted material. "
+                              "Your file was deleted.")
 
         # AP Container
         elif handler:
@@ -129,9 +159,8 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
         elif file.filename.endswith(".archipelago"):
             try:
                 multidata = zfile.open(file).read()
-            except:
-                flash("Could not load multidata. File may be corrupted or incompatible.")
-                multidata = None
+            except Exception as e:
+                raise UploadError("Could not load multidata. File may be corrupted or incompatible.") from e
 
 
         # Factorio
@@ -139,8 +168,7 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
             try:
                 _, _, slot_id, *_ = file.filename.split('_')[0].split('-', 3)
             except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
-                return
+                raise UploadError("Error: Unexpected file found in .zip: " + file.filename)
             data = zfile.open(file, "r").read()
             files[int(slot_id[1:])] = data
 
@@ -149,23 +177,53 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
             try:
                 _, _, slot_id, *_ = file.filename.split('.')[0].split('_', 3)
             except ValueError:
-                flash("Error: Unexpected file found in .zip: " + file.filename)
-                return
+                raise UploadError("Error: Unexpected file found in .zip: " + file.filename)
             data = zfile.open(file, "r").read()
             files[int(slot_id[1:])] = data
 
     # Load multi data.
-    if multidata:
-        slots, multidata = process_multidata(multidata, files)
-
-        seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
-                    id=sid if sid else uuid.uuid4())
-        flush()  # create seed
-        for slot in slots:
-            slot.seed = seed
-        return seed
-    else:
-        flash("No multidata was found in the zip file, which is required.")
+    if not multidata:
+        raise UploadError("No multidata was found in the zip file, which is required.")
+    slots, multidata = process_multidata(multidata, files)
+
+    seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
+                id=sid if sid else uuid.uuid4())
+    flush()  # create seed
+    for slot in slots:
+        slot.seed = seed
+    return seed
+
+
+def process_queued_upload(data: bytes, owner: uuid.UUID, sid: uuid.UUID) -> typing.Optional[uuid.UUID]:
+    """
+    Store an upload that was queued as a Generation, run by a generator process. Returns the id of the new Seed,
+    or records the error on the Generation for its wait page.
+    """
+    from .generate import set_generation_error
+
+    with db_session:
+        try:
+            if zipfile.is_zipfile(BytesIO(data)):
+                with zipfile.ZipFile(BytesIO(data), "r") as zfile:
+                    upload_zip_to_db(zfile, owner, sid=sid)
+            else:
+                slots, multidata = process_multidata(data)
+                Seed(id=sid, multidata=multidata, slots=slots, owner=owner)
+                flush()  # place into DB
+        except UploadError as e:
+            error = str(e)
+        except VersionException:
+            error = "Could not load multidata. Wrong Version detected."
+        except Exception as e:
+            error = f"Could not load multidata. File may be corrupted or incompatible. ({e})"
+        else:
+            generation = Generation.get(id=sid)
+            if generation is not None:
+                generation.delete()
+            return sid
+        rollback()
+    set_generation_error(sid, error)
+    return None
 
 
 @app.route("/uploads", methods=["GET", "POST"])
@@ -180,25 +238,36 @@ def uploads():
             if uploaded_file.filename == "":
                 flash("No selected file.")
             elif uploaded_file and allowed_generation(uploaded_file.filename):
-                if zipfile.is_zipfile(uploaded_file):
+                size = uploaded_file.seek(0, os.SEEK_END)
+                uploaded_file.seek(0)
+                if size >= app.config["UPLOAD_JOB_THRESHOLD"]:
+                    # large uploads take a while to process, so they are queued for the generators instead
+                    generation = Generation(options=uploaded_file.read(),
+                                            meta=json.dumps({"race": False, "upload": True}),
+                                            state=STATE_QUEUED,
+                                            owner=session["_id"])
+                    commit()
+                    return redirect(url_for("wait_seed", seed=generation.id))
+                elif zipfile.is_zipfile(uploaded_file):
                     with zipfile.ZipFile(uploaded_file, "r") as zfile:
                         try:
-                            res = upload_zip_to_db(zfile)
+                            seed = upload_zip_to_db(zfile)
+                        except UploadError as e:
+                            flash(e.message)
                         except VersionException:
                             flash(f"Could not load multidata. Wrong Version detected.")
                         except Exception as e:
                             flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
                         else:
-                            if res is str:
-                                return res
-                            elif res:
-                                return redirect(url_for("view_seed", seed=res.id))
+                            return redirect(url_for("view_seed", seed=seed.id))
                 else:
                     uploaded_file.seek(0)  # offset from is_zipfile check
                     # noinspection PyBroadException
                     try:
                         multidata = uploaded_file.read()
                         slots, multidata = process_multidata(multidata)
+                    except UploadError as e:
+                        flash(e.message)
                     except Exception as e:
                         flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
                     else:
@@ -376,3 +376,197 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+# JSON encoding for NetUtils.encode, producing exactly what json.JSONEncoder(ensure_ascii=False,
+# separators=(',', ':')) produces after NetUtils._scan_for_TypedTuples, without building the scanned copy.
+from json.encoder import encode_basestring as _encode_str
+from libc.math cimport isnan, isinf
+
+cdef int MAX_ENCODE_DEPTH = 1000
+cdef dict _typed_tuple_parts = {}  # NamedTuple type -> (encoded '{"field":' and ',"field":' keys, '"class":"Name"}')
+
+
+cdef str _encode_float(object o):
+    cdef double value = o
+    if isnan(value):
+        return "NaN"
+    if isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(o)
+
+
+cdef tuple _get_typed_tuple_parts(type cls):
+    parts = _typed_tuple_parts.get(cls)
+    if parts is None:
+        fields = cls._fields
+        keys = tuple(("{" if i == 0 else ",") + _encode_str(field) + ":" for i, field in enumerate(fields))
+        suffix = ("," if fields else "{") + '"class":' + _encode_str(cls.__name__) + "}"
+        parts = _typed_tuple_parts[cls] = (keys, suffix)
+    return parts
+
+
+cdef str _encode_key(object key):
+    if isinstance(key, str):
+        return _encode_str(key)
+    if isinstance(key, float):
+        return '"' + _encode_float(key) + '"'
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return '"' + int.__repr__(key) + '"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+cdef int _encode_dict_items(object items, list parts, int depth, bint plain) except -1:
+    cdef bint first = True
+    parts.append("{")
+    for key, value in items:
+        if first:
+            first = False
+        else:
+            parts.append(",")
+        parts.append(_encode_key(key))
+        parts.append(":")
+        if plain:
+            _encode_plain_value(value, parts, depth)
+        else:
+            _encode_value(value, parts, depth)
+    parts.append("}")
+    return 0
+
+
+cdef int _encode_array(object values, list parts, int depth, bint plain) except -1:
+    cdef bint first = True
+    parts.append("[")
+    for value in values:
+        if first:
+            first = False
+        else:
+            parts.append(",")
+        if plain:
+            _encode_plain_value(value, parts, depth)
+        else:
+            _encode_value(value, parts, depth)
+    parts.append("]")
+    return 0
+
+
+cdef int _encode_value(object o, list parts, int depth) except -1:
+    cdef type cls = type(o)
+    cdef tuple keys
+    cdef Py_ssize_t i
+    depth += 1
+    if depth > MAX_ENCODE_DEPTH:
+        raise RecursionError("maximum recursion depth exceeded while encoding a JSON object")
+    if o is None:
+        parts.append("null")
+    elif o is True:
+        parts.append("true")
+    elif o is False:
+        parts.append("false")
+    elif cls is str:
+        parts.append(_encode_str(o))
+    elif cls is int:
+        parts.append(int.__repr__(o))
+    elif cls is float:
+        parts.append(_encode_float(o))
+    elif cls is list or cls is tuple:
+        _encode_array(o, parts, depth, False)
+    elif cls is dict:
+        _encode_dict_items((<dict>o).items(), parts, depth, False)
+    elif isinstance(o, tuple) and hasattr(o, "_fields"):  # NamedTuple is not actually a parent class
+        # fields are not scanned, like the values of _asdict() in _scan_for_TypedTuples
+        keys, suffix = _get_typed_tuple_parts(cls)
+        for i in range(len(keys)):
+            parts.append(keys[i])
+            _encode_plain_value((<tuple>o)[i], parts, depth)
+        parts.append(suffix)
+    elif isinstance(o, (tuple, list, set, frozenset)):
+        _encode_array(o, parts, depth, False)
+    elif isinstance(o, dict):
+        _encode_dict_items(o.items(), parts, depth, False)
+    elif isinstance(o, str):
+        parts.append(_encode_str(o))
+    elif isinstance(o, int):
+        parts.append(int.__repr__(o))
+    elif isinstance(o, float):
+        parts.append(_encode_float(o))
+    else:
+        raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+    return 0
+
+
+cdef int _encode_plain_value(object o, list parts, int depth) except -1:
+    # encodes like json.JSONEncoder itself, so NamedTuples are arrays and sets are not serializable
+    depth += 1
+    if depth > MAX_ENCODE_DEPTH:
+        raise RecursionError("maximum recursion depth exceeded while encoding a JSON object")
+    if o is None:
+        parts.append("null")
+    elif o is True:
+        parts.append("true")
+    elif o is False:
+        parts.append("false")
+    elif isinstance(o, str):
+        parts.append(_encode_str(o))
+    elif isinstance(o, int):
+        parts.append(int.__repr__(o))
+    elif isinstance(o, float):
+        parts.append(_encode_float(o))
+    elif isinstance(o, (list, tuple)):
+        _encode_array(o, parts, depth, True)
+    elif isinstance(o, dict):
+        _encode_dict_items(o.items(), parts, depth, True)
+    else:
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    return 0
+
+
+def encode(obj: Any) -> str:
+    """Encodes obj to the same JSON as NetUtils.encode does."""
+    cdef list parts = []
+    _encode_value(obj, parts, 0)
+    return "".join(parts)
+
+
+cdef object _missing = object()
+
+
+@cython.auto_pickle(False)
+@cython.final
+cdef class ObjectHook:
+    """JSON object_hook restoring allowed types and running custom hooks by "class", like NetUtils._object_hook."""
+    cdef dict custom_hooks
+    cdef dict allowlist
+
+    def __init__(self, custom_hooks: Dict[str, Any], allowlist: Dict[str, Any]) -> None:
+        self.custom_hooks = custom_hooks
+        self.allowlist = allowlist
+
+    def __call__(self, o: Any) -> Any:
+        if not isinstance(o, dict):
+            return o
+        name = o.get("class", None)
+        if name is None:
+            return o
+        hook = self.custom_hooks.get(name, None)
+        if hook:
+            return hook(o)
+        cls = self.allowlist.get(name, None)
+        if cls:
+            fields = cls._fields
+            if len(o) == len(fields) + 1:
+                # exactly the fields and "class", as sent by encode; skips the keyword argument parsing of cls(**o)
+                values = [o.get(field, _missing) for field in fields]
+                if _missing not in values:
+                    return tuple.__new__(cls, values)
+            for key in tuple(o):
+                if key not in fields:
+                    del o[key]
+            return cls(**o)
+        return o
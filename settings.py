@@ -609,6 +609,20 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class SaveJournal(IntEnum):
+        """
+        Append only what changed to a journal next to the save file on each save,
+        writing the full save only once the journal has grown large
+        """
+        OFF = 0
+        ON = 1
+
+    class OutboundBatchMs(int):
+        """
+        Collect outgoing messages for this many milliseconds and send each client one combined frame,
+        0 to send right away. 20 to 50 reduces the traffic of release, collect and rapid location checks
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -628,6 +642,8 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    save_journal: SaveJournal = SaveJournal(False)
+    outbound_batch_ms: OutboundBatchMs = OutboundBatchMs(0)
 
 
 class GeneratorOptions(Group):
@@ -0,0 +1,237 @@
+"""
+End-to-end generation benchmark.
+
+Generates fixed-seed multiworlds of 1, 10, 50 and 200 slots, single-game and mixed-game, with and without item links
+and entrance randomization, timing each stage of Main.main through its --profile output.
+Results are written as JSON, and two results files can be compared to look for regressions:
+
+    python test/benchmark/generation.py --scenarios "single_*" "mixed_10*" --output new.json
+    python test/benchmark/generation.py --compare old.json new.json
+"""
+import typing
+
+single_game: str = "TUNIC"
+mixed_games: typing.Tuple[str, ...] = (
+    "A Short Hike",
+    "Timespinner",
+    "Subnautica",
+    "Risk of Rain 2",
+    "TUNIC",
+    "Super Mario 64",
+    "Raft",
+    "Muse Dash",
+    "The Witness",
+    "Hylics 2",
+    "Lingo",
+    "Terraria",
+    "Factorio",
+    "Dark Souls III",
+    "Yacht Dice",
+)
+"""Games which generate and output without any external files."""
+entrance_rando_options: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    "TUNIC": {"entrance_rando": "yes"},
+    "Super Mario 64": {"area_rando": "courses_and_secrets"},
+}
+"""Options turning on entrance randomization, for the games that have it."""
+slot_counts: typing.Tuple[int, ...] = (1, 10, 50, 200)
+item_link_size: int = 5
+"""Number of consecutive slots of the same game sharing one item link."""
+
+
+class Scenario(typing.NamedTuple):
+    name: str
+    slots: int
+    mixed: bool
+    item_links: bool
+    entrance_rando: bool
+    seed: int
+
+    def player_options(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        players = []
+        for slot in range(self.slots):
+            game = mixed_games[slot % len(mixed_games)] if self.mixed else single_game
+            game_options: typing.Dict[str, typing.Any] = {}
+            if self.entrance_rando:
+                game_options.update(entrance_rando_options.get(game, {}))
+            if self.item_links:
+                # slots of the same game, counted from the first, are linked in groups of item_link_size
+                same_game_index = slot // len(mixed_games) if self.mixed else slot
+                game_options["item_links"] = [{
+                    "name": f"{game} Link {same_game_index // item_link_size + 1}",
+                    "item_pool": ["Everything"],
+                    "replacement_item": None,
+                }]
+            players.append({"name": f"Player{slot + 1}", "game": game, game: game_options})
+        return players
+
+
+def get_scenarios() -> typing.Dict[str, Scenario]:
+    scenarios: typing.Dict[str, Scenario] = {}
+    for slots in slot_counts:
+        for mixed in (False, True):
+            for item_links in (False, True):
+                for entrance_rando in (False, True):
+                    name = f"{'mixed' if mixed else 'single'}_{slots}"
+                    if item_links:
+                        name += "_links"
+                    if entrance_rando:
+                        name += "_er"
+                    scenarios[name] = Scenario(name, slots, mixed, item_links, entrance_rando, seed=slots)
+    return scenarios
+
+
+def run_scenario(scenario: Scenario) -> typing.Dict[str, typing.Any]:
+    """Generate a scenario with output and return its total time and the time of each stage of Main.main."""
+    import json
+    import os
+    import tempfile
+    import time
+
+    import yaml
+
+    import Generate
+    import Main
+
+    with tempfile.TemporaryDirectory() as player_files, tempfile.TemporaryDirectory() as output:
+        for player, options in enumerate(scenario.player_options(), 1):
+            with open(os.path.join(player_files, f"Player{player}.yaml"), "w", encoding="utf-8") as f:
+                yaml.dump(options, f)
+        args = Generate.mystery_argparse(["--seed", str(scenario.seed), "--player_files_path", player_files,
+                                          "--outputpath", output, "--spoiler", "3", "--profile"])
+        start = time.perf_counter()
+        multiworld = Main.main(*Generate.main(args))
+        total = time.perf_counter() - start
+        with open(os.path.join(output, f"AP_{multiworld.seed_name}_profile.json"), encoding="utf-8") as f:
+            profile = json.load(f)
+
+    stages: typing.Dict[str, typing.Dict[str, float]] = {}
+    for stage in profile["stages"]:
+        stage_times = stages.setdefault(stage["name"], {"wall": 0.0, "cpu": 0.0})
+        stage_times["wall"] += stage["wall"]
+        stage_times["cpu"] += stage["cpu"]
+    return {
+        "total": total,
+        "peak_rss": profile["peak_rss"],
+        "sweeps": profile["sweeps"],
+        "reachable_region_updates": profile["reachable_region_updates"],
+        "stages": stages,
+    }
+
+
+def run_generation_benchmark(scenario_patterns: typing.Sequence[str] = ("*",), runs: int = 1,
+                             output_file: typing.Optional[str] = None) -> typing.Dict[str, typing.Any]:
+    """
+    Run each matching scenario in a fresh process, keeping the fastest of the runs.
+
+    :param scenario_patterns: fnmatch patterns of the scenario names to run.
+    :param runs: Number of times each scenario is generated.
+    :param output_file: Path to write the results to as JSON.
+    """
+    import concurrent.futures
+    import fnmatch
+    import json
+    import logging
+    import multiprocessing
+    import platform
+
+    from Utils import __version__, init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    scenarios = [scenario for name, scenario in get_scenarios().items()
+                 if any(fnmatch.fnmatch(name, pattern) for pattern in scenario_patterns)]
+    results: typing.Dict[str, typing.Any] = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        scenario_runs = []
+        for _ in range(runs):
+            # a fresh process each run, so neither caches nor memory use carry over between runs
+            with concurrent.futures.ProcessPoolExecutor(1, multiprocessing.get_context("spawn")) as pool:
+                scenario_runs.append(pool.submit(run_scenario, scenario).result())
+        result = min(scenario_runs, key=lambda scenario_run: scenario_run["total"])
+        results["scenarios"][scenario.name] = result
+        logger.info(f"{scenario.name}: {result['total']:.2f} seconds, {result['sweeps']} sweeps")
+
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        logger.info(f"Wrote results to {output_file}")
+    return results
+
+
+def compare_results(baseline: typing.Dict[str, typing.Any], current: typing.Dict[str, typing.Any],
+                    threshold: float = 0.1, minimum: float = 0.05) -> typing.List[str]:
+    """
+    Compare two benchmark results, returning a line for each scenario and stage that got slower.
+
+    :param threshold: Relative slowdown of wall time to report.
+    :param minimum: Stages faster than this many seconds in both results are ignored, as they are mostly noise.
+    """
+    regressions: typing.List[str] = []
+
+    def check(name: str, old: float, new: float) -> None:
+        if max(old, new) >= minimum and new > old * (1 + threshold):
+            regressions.append(f"{name}: {old:.3f}s -> {new:.3f}s ({(new / old - 1) * 100 if old else 100:+.1f}%)")
+
+    for scenario_name, new_result in current["scenarios"].items():
+        old_result = baseline["scenarios"].get(scenario_name)
+        if not old_result:
+            continue
+        check(scenario_name, old_result["total"], new_result["total"])
+        for stage_name, new_stage in new_result["stages"].items():
+            old_stage = old_result["stages"].get(stage_name)
+            if old_stage:
+                check(f"{scenario_name} {stage_name}", old_stage["wall"], new_stage["wall"])
+    return regressions
+
+
+def print_comparison(baseline_file: str, current_file: str, threshold: float = 0.1) -> bool:
+    """Print a table of total times of two results files and any regressions. Returns whether there were none."""
+    import json
+
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_file, encoding="utf-8") as f:
+        current = json.load(f)
+
+    print(f"{'scenario':24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for scenario_name, new_result in current["scenarios"].items():
+        old_result = baseline["scenarios"].get(scenario_name)
+        if old_result:
+            old, new = old_result["total"], new_result["total"]
+            print(f"{scenario_name:24} {old:10.2f} {new:10.2f} {(new / old - 1) * 100:+7.1f}%")
+    regressions = compare_results(baseline, current, threshold)
+    if regressions:
+        print(f"\nRegressions over {threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+    return not regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser(description="End-to-end generation benchmark.")
+    parser.add_argument("--scenarios", nargs="+", default=["*"],
+                        help=f"fnmatch patterns of scenarios to run, out of: {', '.join(get_scenarios())}")
+    parser.add_argument("--runs", type=int, default=1, help="Generate each scenario this often, keeping the fastest.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two results files instead of running, exiting with 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown of a scenario or stage to report as a regression.")
+    cli_args = parser.parse_args()
+    if cli_args.compare:
+        sys.exit(0 if print_comparison(*cli_args.compare, threshold=cli_args.threshold) else 1)
+    run_generation_benchmark(cli_args.scenarios, cli_args.runs, cli_args.output)
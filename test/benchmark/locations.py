@@ -20,6 +20,7 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
     from BaseClasses import MultiWorld, CollectionState, Location
     from worlds import AutoWorld
     from worlds.AutoWorld import call_all
+    from worlds.generic.Rules import And, CanReach, Count, Has, HasAll, Or, Rule, add_rule, set_rule
 
     init_logging("Benchmark Runner")
     logger = logging.getLogger("Benchmark")
@@ -55,12 +56,50 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
                 gc.unfreeze()
             return t.dif
 
+        @staticmethod
+        def lambda_chain(rule: Rule) -> typing.Callable[[CollectionState], bool]:
+            """Builds the access rule a world would get for rule by combining plain lambdas with add_rule."""
+            if isinstance(rule, (And, Or)):
+                if not rule.rules:
+                    return lambda state: isinstance(rule, And)
+                spot = Location(1, "Lambda Chain")
+                set_rule(spot, BenchmarkRunner.lambda_chain(rule.rules[0]))
+                for child in rule.rules[1:]:
+                    add_rule(spot, BenchmarkRunner.lambda_chain(child), "and" if isinstance(rule, And) else "or")
+                return spot.access_rule
+            if isinstance(rule, Has):
+                return lambda state: state.has(rule.item, rule.player, rule.count)
+            if isinstance(rule, HasAll):
+                return lambda state: state.has_all(rule.items, rule.player)
+            if isinstance(rule, Count):
+                return lambda state: state.has_from_list(rule.items, rule.player, rule.count)
+            if isinstance(rule, CanReach):
+                return lambda state: state.can_reach(rule.spot, rule.resolution_hint, rule.player)
+            raise TypeError(f"No lambda equivalent for {rule!r}")
+
+        def lambda_chain_test(self, test_location: Location, state: CollectionState, state_name: str) -> float:
+            """Times the add_rule lambda chain equivalent to the compiled access_rule of a location."""
+            access_rule = self.lambda_chain(test_location.access_rule.rule)
+            if freeze_gc:
+                gc.freeze()
+            with TimeIt(f"{test_location.game} {self.rule_iterations} "
+                        f"runs of {test_location} lambda chain({state_name})", logger) as t:
+                for _ in range(self.rule_iterations):
+                    access_rule(state)
+                gc.collect()
+            if freeze_gc:
+                gc.unfreeze()
+            return t.dif
+
         def main(self):
             for game in sorted(AutoWorld.AutoWorldRegister.world_types):
                 summary_data: typing.Dict[str, collections.Counter[str]] = {
                     "empty_state": collections.Counter(),
                     "all_state": collections.Counter(),
                 }
+                # times of locations using the rule IR from worlds.generic.Rules, and of the equivalent lambda chains
+                compiled_times: typing.List[float] = []
+                chain_times: typing.List[float] = []
                 try:
                     multiworld = MultiWorld(1)
                     multiworld.game[1] = game
@@ -96,6 +135,11 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
                         time_taken = self.location_test(location, all_state, "all_state")
                         summary_data["all_state"][location.name] = time_taken
 
+                        if isinstance(getattr(location.access_rule, "rule", None), Rule):
+                            compiled_times.append(summary_data["empty_state"][location.name] + time_taken)
+                            chain_times.append(self.lambda_chain_test(location, multiworld.state, "empty_state") +
+                                               self.lambda_chain_test(location, all_state, "all_state"))
+
                     total_empty_state = sum(summary_data["empty_state"].values())
                     total_all_state = sum(summary_data["all_state"].values())
 
@@ -106,6 +150,10 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
                                 f"{self.format_times_from_counter(summary_data['empty_state'])}")
                     logger.info(f"Top times in all_state:\n"
                                 f"{self.format_times_from_counter(summary_data['all_state'])}")
+                    if compiled_times:
+                        logger.info(f"{game} uses compiled rules on {len(compiled_times)}/{len(locations)} locations, "
+                                    f"which are {sum(chain_times) / sum(compiled_times):.2f}x as fast as "
+                                    f"the equivalent add_rule lambda chains.")
 
                 except Exception as e:
                     logger.exception(e)
@@ -463,6 +463,33 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_unreachable_regions_keep_location_order(self):
+        """Test that locations in unreachable regions are skipped and returned unfilled in their original order"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 2, 0, 2)
+        player1.generate_region(player1.menu, 3, lambda state: False)
+        locations = player1.locations[2:] + player1.locations[:2]
+        unreachable = locations[:3]
+
+        fill_restrictive(multiworld, multiworld.state, locations, player1.basic_items)
+
+        self.assertEqual(unreachable, locations)
+        self.assertTrue(all(location.item for location in player1.locations[:2]))
+        self.assertFalse(any(location.item for location in unreachable))
+
+    def test_always_allow_in_unreachable_region(self):
+        """Test that `fill_restrictive` still considers always_allow locations in unreachable regions"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 0, 0, 1)
+        region = player1.generate_region(player1.menu, 1, lambda state: False)
+        location = region.locations[0]
+        location.always_allow = lambda state, item: True
+
+        fill_restrictive(multiworld, multiworld.state, player1.locations, player1.basic_items)
+
+        self.assertEqual([], player1.locations)
+        self.assertIsNotNone(location.item)
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
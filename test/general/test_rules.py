@@ -0,0 +1,96 @@
+import unittest
+
+from BaseClasses import CollectionState, Location
+from worlds.generic.Rules import And, CanReach, Count, Has, HasAll, Or, Rule, add_rule, set_rule
+from . import generate_items, generate_test_multiworld
+
+
+class TestRuleIR(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.location = Location(1, "location", None, self.menu)
+        self.menu.locations.append(self.location)
+        self.items = generate_items(3, 1, True)
+
+    def state_with(self, *counts: int) -> CollectionState:
+        state = CollectionState(self.multiworld)
+        for item, count in zip(self.items, counts):
+            for _ in range(count):
+                state.collect(item, True)
+        return state
+
+    def test_simplify(self) -> None:
+        """Test that nested junctions are flattened and redundant item counts merged"""
+        rule = And(Has("A", 1), And(Has("A", 1, 3), Has("B", 1)), Or(Has("C", 1), Has("C", 1, 2)), And())
+        self.assertEqual(And(Has("A", 1, 3), Has("B", 1), Has("C", 1)), rule.simplify())
+        self.assertEqual(Has("A", 1), Or(Has("A", 1), Or()).simplify())
+        self.assertEqual(And(), Or(Has("A", 1), And()).simplify())
+        self.assertEqual(Or(), And(Has("A", 1), Or()).simplify())
+        self.assertEqual(Has("A", 1, 2), Count(["A"], 1, 2).simplify())
+
+    def test_compiled_matches_evaluate(self) -> None:
+        """Test that compiled rules give the same results as walking the rule tree"""
+        item_0, item_1, item_2 = (item.name for item in self.items)
+        rules = [
+            Has(item_0, 1, 2),
+            HasAll([item_0, item_1], 1),
+            Count([item_0, item_1, item_2], 1, 3),
+            Has(item_0, 1) | Has(item_2, 1) & Has(item_1, 1, 2),
+            CanReach("Menu", 1) & Has(item_1, 1),
+            And(),
+            Or(),
+        ]
+        for counts in [(0, 0, 0), (1, 0, 0), (2, 0, 1), (0, 2, 1), (1, 1, 1), (2, 2, 2)]:
+            state = self.state_with(*counts)
+            for rule in rules:
+                with self.subTest(rule=rule, counts=counts):
+                    self.assertEqual(rule.evaluate(state), rule.compile()(state))
+                    self.assertIsInstance(rule.compile()(state), bool)
+
+    def test_add_rule_combines_ir(self) -> None:
+        """Test that adding IR to an IR access rule compiles them into a single rule"""
+        item_0, item_1, _ = (item.name for item in self.items)
+        set_rule(self.location, Has(item_0, 1))
+        add_rule(self.location, Has(item_1, 1))
+        self.assertEqual(And(Has(item_1, 1), Has(item_0, 1)), self.location.access_rule.rule)
+        self.assertEqual({1: {item_0, item_1}}, self.location.access_rule.item_requirements)
+        self.assertFalse(self.location.can_reach(self.state_with(1)))
+        self.assertTrue(self.location.can_reach(self.state_with(1, 1)))
+
+        add_rule(self.location, Has(item_0, 1, 2), "or")
+        self.assertTrue(self.location.can_reach(self.state_with(2)))
+
+    def test_mixed_rules(self) -> None:
+        """Test that IR and plain callables can be combined in either order"""
+        item_0, item_1, _ = (item.name for item in self.items)
+        set_rule(self.location, lambda state: state.has(item_0, 1))
+        add_rule(self.location, Has(item_1, 1))
+        self.assertFalse(self.location.can_reach(self.state_with(0, 1)))
+        self.assertTrue(self.location.can_reach(self.state_with(1, 1)))
+
+        set_rule(self.location, Has(item_0, 1))
+        add_rule(self.location, lambda state: state.has(item_1, 1))
+        self.assertFalse(self.location.can_reach(self.state_with(1)))
+        self.assertTrue(self.location.can_reach(self.state_with(1, 1)))
+
+        location = Location(1, "empty", None, self.menu)
+        add_rule(location, Has(item_0, 1))
+        self.assertEqual(Has(item_0, 1), location.access_rule.rule)
+
+        def other_rule(state: CollectionState) -> bool:
+            return state.has(item_0, 1)
+        other_rule.rule = "not a Rule"
+        set_rule(self.location, other_rule)
+        add_rule(self.location, Has(item_1, 1))
+        self.assertFalse(self.location.can_reach(self.state_with(1)))
+        self.assertTrue(self.location.can_reach(self.state_with(1, 1)))
+
+    def test_incomplete_rule(self) -> None:
+        """Test that a rule type missing part of the IR fails when it is created"""
+        class Incomplete(Rule):
+            def evaluate(self, state: CollectionState) -> bool:
+                return True
+
+        with self.assertRaises(TypeError):
+            Incomplete()
@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+
+from Fill import FillError, distribute_items_restrictive
+from Options import Accessibility
+from worlds.AutoWorld import AutoWorldRegister, World, call_all
+from worlds.generic.Rules import set_rule
+from . import generate_items, generate_locations, generate_test_multiworld, setup_multiworld
+
+
+class TestSphereCache(unittest.TestCase):
+    def setUp(self) -> None:
+        world_types = [AutoWorldRegister.world_types[game] for game in ("A Short Hike", "Hylics 2", "A Short Hike")]
+        self.multiworld = setup_multiworld(world_types, seed=0)
+        distribute_items_restrictive(self.multiworld)
+        call_all(self.multiworld, "post_fill")
+
+    def results(self):
+        multiworld = self.multiworld
+        multiworld.spoiler.create_playthrough(create_paths=True)
+        return ([list(sphere) for sphere in multiworld.get_spheres()],
+                [sorted(sphere) for sphere in multiworld.get_sendable_spheres()],
+                multiworld.fulfills_accessibility(),
+                multiworld.spoiler.playthrough,
+                multiworld.spoiler.paths)
+
+    def test_cached_results_match(self) -> None:
+        """Test that everything using the sphere cache gives the same results as computing spheres on its own"""
+        uncached = self.results()
+        self.multiworld.cache_spheres()
+        cached = self.results()
+        self.assertEqual([set(sphere) for sphere in uncached[0]], [set(sphere) for sphere in cached[0]])
+        self.assertEqual(uncached[1:], cached[1:])
+
+    def test_accessibility_counted_filler_ignores_cache(self) -> None:
+        """Test that the accessibility check only collects relevant items, even if a world counts filler in its state"""
+        multiworld = generate_test_multiworld()
+        multiworld.worlds[1].options.accessibility = Accessibility(Accessibility.option_minimal)
+        locations = generate_locations(2, 1, multiworld.get_region("Menu", 1))
+        item = generate_items(1, 1, True)[0]
+        coin = generate_items(1, 1)[0]
+        set_rule(locations[1], lambda state: state.has(coin.name, 1))
+        multiworld.completion_condition[1] = lambda state: state.has(item.name, 1)
+        multiworld.push_item(locations[0], coin, False)
+        multiworld.push_item(locations[1], item, False)
+
+        def collect(world: World, state, collected_item) -> bool:
+            if collected_item == coin:
+                state.prog_items[collected_item.player][collected_item.name] += 1
+                return True
+            return World.collect(world, state, collected_item)
+
+        with patch.object(type(multiworld.worlds[1]), "collect", collect):
+            multiworld.cache_spheres()
+            with self.assertRaises(FillError):
+                multiworld.fulfills_accessibility()
+
+    def test_push_item_drops_cache(self) -> None:
+        """Test that changing placements drops the sphere cache"""
+        self.multiworld.cache_spheres()
+        location = next(iter(self.multiworld.get_filled_locations()))
+        self.multiworld.push_item(location, location.item, False)
+        self.assertIsNone(self.multiworld.sphere_cache)
+
+
+class TestPlaythrough(unittest.TestCase):
+    def test_unneeded_progression_culled(self) -> None:
+        """Test that the playthrough only keeps the progression needed to beat the game, in the right spheres"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locations = generate_locations(5, 1, menu)
+        items = generate_items(5, 1, True)
+        item_names = [item.name for item in items]
+        set_rule(locations[1], lambda state: state.has(item_names[0], 1))
+        set_rule(locations[2], lambda state: state.has(item_names[0], 1))
+        set_rule(locations[3], lambda state: state.has(item_names[1], 1))
+        set_rule(locations[4], lambda state: state.has_any((item_names[1], item_names[2]), 1))
+        multiworld.completion_condition[1] = lambda state: state.has(item_names[3], 1)
+        for location, item in zip(locations, (items[0], items[1], items[4], items[3], items[2])):
+            multiworld.push_item(location, item, False)
+
+        multiworld.spoiler.create_playthrough(create_paths=False)
+        self.assertEqual({
+            "0": [],
+            "1": {str(locations[0]): str(items[0])},
+            "2": {str(locations[1]): str(items[1])},
+            "3": {str(locations[3]): str(items[3])},
+        }, multiworld.spoiler.playthrough)
+
+    def test_counted_filler_ignores_cache(self) -> None:
+        """Test that the playthrough only collects progression, even if a world counts filler in its state"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locations = generate_locations(4, 1, menu)
+        items = generate_items(3, 1, True)
+        coin = generate_items(1, 1)[0]
+        item_names = [item.name for item in items]
+        set_rule(locations[1], lambda state: state.has(item_names[0], 1))
+        set_rule(locations[2], lambda state: state.has(coin.name, 1) or state.has(item_names[1], 1))
+        multiworld.completion_condition[1] = lambda state: state.has(item_names[2], 1)
+        for location, item in zip(locations, (items[0], items[1], items[2], coin)):
+            multiworld.push_item(location, item, False)
+
+        def collect(world: World, state, item) -> bool:
+            if item == coin:
+                state.prog_items[item.player][item.name] += 1
+                return True
+            return World.collect(world, state, item)
+
+        with patch.object(type(multiworld.worlds[1]), "collect", collect):
+            multiworld.cache_spheres()
+            multiworld.spoiler.create_playthrough(create_paths=False)
+        self.assertEqual({
+            "0": [],
+            "1": {str(locations[0]): str(items[0])},
+            "2": {str(locations[1]): str(items[1])},
+            "3": {str(locations[2]): str(items[2])},
+        }, multiworld.spoiler.playthrough)
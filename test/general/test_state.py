@@ -1,7 +1,9 @@
 import unittest
+from collections import Counter
 
+from BaseClasses import CollectionState, Item, ItemClassification, ItemDependencyCounter, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +29,140 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestItemDependencyIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.world = self.multiworld.worlds[1]
+        self.world.item_dependency_index = True
+        self.evaluations = Counter()
+        menu = self.multiworld.get_region("Menu", 1)
+        regions = {name: Region(name, 1, self.multiworld) for name in ("Cave", "Lake", "Tower")}
+        self.multiworld.regions += regions.values()
+
+        def counted(name: str, rule):
+            def wrapped(state: CollectionState) -> bool:
+                self.evaluations[name] += 1
+                return rule(state)
+            return wrapped
+
+        menu.connect(regions["Cave"], "Cave Door", counted("Cave Door", lambda state: state.has("Lamp", 1)))
+        menu.connect(regions["Lake"], "Lake Path",
+                     counted("Lake Path", lambda state: state.has("Flippers", 1) or state.has("Boat", 1)))
+        regions["Cave"].connect(regions["Tower"], "Tower Stairs",
+                                counted("Tower Stairs", lambda state: state.count("Key", 1) >= 2))
+
+    def test_same_reachability_as_full_rescan(self) -> None:
+        """Ensure the indexed update reaches the same regions as re-evaluating every blocked connection."""
+        indexed_state = CollectionState(self.multiworld)
+        self.assertIsInstance(indexed_state.prog_items[1], ItemDependencyCounter)
+        self.world.item_dependency_index = False
+        full_state = CollectionState(self.multiworld)
+        self.world.item_dependency_index = True
+        for item_name in ("Key", "Boat", "Lamp", "Flippers", "Key"):
+            item = Item(item_name, ItemClassification.progression, None, 1)
+            indexed_state.collect(item, True)
+            full_state.collect(item, True)
+            for region in self.multiworld.get_regions(1):
+                with self.subTest(item=item_name, region=region.name):
+                    self.assertEqual(region.can_reach(indexed_state), region.can_reach(full_state))
+        self.assertTrue(self.multiworld.get_region("Tower", 1).can_reach(indexed_state))
+
+    def test_unrelated_items_skip_rules(self) -> None:
+        """Ensure collecting an item does not re-evaluate rules that never read it."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(state))
+        self.evaluations.clear()
+        state.collect(Item("Boat", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.multiworld.get_region("Lake", 1).can_reach(state))
+        self.assertEqual(self.evaluations["Lake Path"], 1)
+        self.assertEqual(self.evaluations["Cave Door"], 0)
+
+    def test_copy_keeps_pending_changes(self) -> None:
+        """Ensure a copied state still re-evaluates connections affected by items collected before the copy."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(state))
+        state.collect(Item("Lamp", ItemClassification.progression, None, 1), True)
+        copied_state = state.copy()
+        self.assertTrue(self.multiworld.get_region("Cave", 1).can_reach(copied_state))
+        self.assertTrue(self.multiworld.get_region("Cave", 1).can_reach(state))
+
+
+class TestStateCopy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            cave = Region("Cave", player, self.multiworld)
+            self.multiworld.regions.append(cave)
+            menu.connect(cave, f"Cave Door {player}", lambda state, player=player: state.has("Lamp", player))
+
+    def test_copies_are_independent(self) -> None:
+        """Ensure changes to a copied state and to the state it was copied from don't affect each other."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(state))
+        copied_state = state.copy()
+        copied_state.collect(Item("Lamp", ItemClassification.progression, None, 1), True)
+        copied_state.prog_items[2]["Rope"] += 1
+        self.assertTrue(self.multiworld.get_region("Cave", 1).can_reach(copied_state))
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(state))
+        self.assertFalse(state.has("Lamp", 1))
+        self.assertFalse(state.has("Rope", 2))
+        self.assertNotIn(self.multiworld.get_region("Cave", 1), state.path)
+        self.assertIn(self.multiworld.get_region("Cave", 1), copied_state.path)
+
+        state.collect(Item("Lamp", ItemClassification.progression, None, 2), True)
+        self.assertTrue(self.multiworld.get_region("Cave", 2).can_reach(state))
+        self.assertFalse(self.multiworld.get_region("Cave", 2).can_reach(copied_state))
+        self.assertFalse(copied_state.has("Lamp", 2))
+
+    def test_copy_of_copy(self) -> None:
+        """Ensure repeatedly copied states keep the items and paths of the states they were copied from."""
+        state = CollectionState(self.multiworld)
+        states = [state]
+        for player in self.multiworld.player_ids:
+            state = state.copy()
+            state.collect(Item("Lamp", ItemClassification.progression, None, player), True)
+            self.assertTrue(self.multiworld.get_region("Cave", player).can_reach(state))
+            states.append(state)
+        for _ in range(10):
+            state = state.copy()
+        for player in self.multiworld.player_ids:
+            cave = self.multiworld.get_region("Cave", player)
+            self.assertTrue(state.has("Lamp", player))
+            self.assertTrue(cave.can_reach(state))
+            self.assertEqual(state.path[cave], states[-1].path[cave])
+        self.assertEqual(dict(state.prog_items), dict(states[-1].prog_items))
+        self.assertFalse(states[0].has("Lamp", 1))
+
+    def test_copy_leaves_state_untouched(self) -> None:
+        """Ensure copying keeps the containers of the copied state, and writes to them still don't reach the copy."""
+        state = CollectionState(self.multiworld)
+        containers = (state.prog_items[1], state.reachable_regions[1], state.blocked_connections[1], state.path)
+        copied_state = state.copy()
+        self.assertEqual(containers,
+                         (state.prog_items[1], state.reachable_regions[1], state.blocked_connections[1], state.path))
+        self.assertTrue(all(a is b for a, b in zip(containers, (state.prog_items[1], state.reachable_regions[1],
+                                                                state.blocked_connections[1], state.path))))
+        containers[0]["Lamp"] += 1
+        self.assertTrue(state.has("Lamp", 1))
+        self.assertFalse(copied_state.has("Lamp", 1))
+        self.assertTrue(self.multiworld.get_region("Cave", 1).can_reach(state))
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(copied_state))
+
+    def test_reads_do_not_copy(self) -> None:
+        """Ensure a copied state shares reachable regions and the path until it updates them."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(state))
+        self.assertFalse(self.multiworld.get_region("Cave", 2).can_reach(state))
+        copied_state = state.copy()
+        self.assertFalse(self.multiworld.get_region("Cave", 1).can_reach(copied_state))
+        self.assertIs(state.reachable_regions[1], copied_state.reachable_regions[1])
+        self.assertIs(state.path, copied_state.path)
+        copied_state.collect(Item("Lamp", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.multiworld.get_region("Cave", 1).can_reach(copied_state))
+        self.assertIsNot(state.reachable_regions[1], copied_state.reachable_regions[1])
+        self.assertIs(state.reachable_regions[2], copied_state.reachable_regions[2])
+        self.assertIsNot(state.path, copied_state.path)
+        self.assertNotIn(self.multiworld.get_region("Cave", 1), state.reachable_regions[1])
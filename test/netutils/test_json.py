@@ -0,0 +1,84 @@
+# Tests for _speedups.encode and _speedups.ObjectHook against the pure python NetUtils implementation
+import enum
+import os
+import typing
+import unittest
+from json import JSONDecoder
+
+import NetUtils
+from NetUtils import ClientStatus, Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType
+
+try:
+    import _speedups
+except ImportError:
+    _speedups = None
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+
+class StrEnum(str, enum.Enum):
+    value_ = "välue"
+
+
+class Nested(typing.NamedTuple):
+    item: NetworkItem
+    items: typing.List[typing.Any]
+    data: typing.Dict[typing.Any, typing.Any]
+
+
+samples = [
+    None, True, False, 0, -1, 2 ** 70, 1.5, 1e16, 1e-5, -0.0, float("nan"), float("inf"), float("-inf"),
+    "", "text", "\"quoted\" \\ \n\t\b\f\r \x00\x1f \x7f   é 😀 \udc80",
+    [], (), set(), frozenset(), {}, [1, [2, (3,)], {4}], {"a": {"b": []}},
+    {1: "int", 1.5: "float", True: "true", False: "false", None: "null", "s": "str", ClientStatus.CLIENT_GOAL: 1},
+    ClientStatus.CLIENT_GOAL, StrEnum.value_, HintStatus.HINT_FOUND,
+    NetworkItem(1, 2, 3, 4), [NetworkItem(i, i, i, 0) for i in range(10)],
+    NetworkPlayer(0, 1, "Alias", "Name"), NetworkSlot("Player", "Game", SlotType.group, [1, 2]),
+    Hint(1, 2, 3, 4, False, "entrance", 1, HintStatus.HINT_PRIORITY),
+    {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 0)] * 3},
+    [{"cmd": "Connected", "slot_info": {1: NetworkSlot("Player", "Game", SlotType.player)},
+      "players": [NetworkPlayer(0, 1, "Player", "Player")], "missing_locations": {1, 2, 3}}],
+    Nested(NetworkItem(1, 2, 3, 4), [NetworkItem(5, 6, 7, 0), (8, [9])],
+           {"slot": NetworkSlot("Player", "Game", SlotType.player), 1: {"item": NetworkItem(1, 2, 3)}}),
+    [Nested(NetworkItem(1, 2, 3), [], {})],
+]
+
+
+@unittest.skipIf(_speedups is None and not ci, "_speedups not available")
+class TestSpeedupsJSON(unittest.TestCase):
+    def setUp(self) -> None:
+        self.assertIsNotNone(_speedups, "Failed to load _speedups")
+
+    def test_encode_identical(self) -> None:
+        """Test that encoding gives the exact same JSON as the pure python implementation"""
+        for sample in samples:
+            with self.subTest(sample=sample):
+                self.assertEqual(NetUtils._encode(NetUtils._scan_for_TypedTuples(sample)), _speedups.encode(sample))
+
+    def test_encode_errors(self) -> None:
+        """Test that unsupported keys and values raise the same errors as the pure python implementation"""
+        for sample in ({(1, 2): 1}, {NetworkItem(1, 2, 3): 1}, object(), [1, b"bytes"],
+                       Nested(NetworkItem(1, 2, 3), [{1}], {})):
+            with self.subTest(sample=sample):
+                with self.assertRaises(TypeError):
+                    NetUtils._encode(NetUtils._scan_for_TypedTuples(sample))
+                with self.assertRaises(TypeError):
+                    _speedups.encode(sample)
+        nested = []
+        for _ in range(2000):
+            nested = [nested]
+        with self.assertRaises(RecursionError):
+            _speedups.encode(nested)
+
+    def test_decode_identical(self) -> None:
+        """Test that decoding with the compiled object hook gives the same objects as the pure python one"""
+        pure_decode = JSONDecoder(object_hook=NetUtils._object_hook).decode
+        decode = JSONDecoder(object_hook=_speedups.ObjectHook(NetUtils.custom_hooks, NetUtils.allowlist)).decode
+        for sample in samples + [{"class": "Version", "major": 1, "minor": 2, "build": 3},
+                                 {"class": "NetworkItem", "item": 1, "location": 2, "player": 3, "extra": 4},
+                                 {"class": "Unknown", "value": 1}]:
+            with self.subTest(sample=sample):
+                data = NetUtils._encode(NetUtils._scan_for_TypedTuples(sample))
+                expected, actual = pure_decode(data), decode(data)
+                self.assertEqual(repr(expected), repr(actual))
+                self.assertEqual(type(expected), type(actual))
@@ -0,0 +1,50 @@
+# Tests for NetUtils.encode_multidata and NetUtils.decode_multidata
+import pickle
+import unittest
+import zlib
+
+from NetUtils import LazyMultiData, NetworkSlot, SlotType, decode_multidata, encode_multidata
+from Utils import VersionException
+
+sample_multidata = {
+    "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player)},
+    "locations": {1: {11: (21, 1, 0)}},
+    "spheres": [{1: {11}}],
+    "seed_name": "12345",
+}
+
+
+class TestMultidataFormat(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """Test that sections decode to what was encoded"""
+        multidata = decode_multidata(encode_multidata(sample_multidata))
+        self.assertIsInstance(multidata, LazyMultiData)
+        self.assertEqual(sample_multidata, dict(multidata))
+
+    def test_lazy_sections(self) -> None:
+        """Test that only accessed sections are decoded and untouched sections are copied when encoding again"""
+        multidata = decode_multidata(encode_multidata(sample_multidata))
+        self.assertEqual(sample_multidata["locations"], multidata["locations"])
+        self.assertIsNone(multidata.raw_section("locations"))
+        self.assertIsNotNone(multidata.raw_section("spheres"))
+        self.assertEqual(sample_multidata["spheres"], multidata.section_loader("spheres")())
+        self.assertEqual([], multidata.section_loader("missing", [])())
+
+        multidata["seed_name"] = "67890"
+        del multidata["slot_info"]
+        self.assertEqual({"locations", "spheres", "seed_name"}, set(multidata))
+        reencoded = decode_multidata(encode_multidata(multidata))
+        self.assertEqual({"locations": sample_multidata["locations"], "spheres": sample_multidata["spheres"],
+                          "seed_name": "67890"}, dict(reencoded))
+
+    def test_format_3(self) -> None:
+        """Test that the previous single pickle format can still be read"""
+        data = bytes([3]) + zlib.compress(pickle.dumps(sample_multidata), 9)
+        self.assertEqual(sample_multidata, decode_multidata(data))
+
+    def test_newer_format(self) -> None:
+        """Test that formats newer than the latest known one are refused"""
+        data = bytearray(encode_multidata(sample_multidata))
+        data[0] += 1
+        with self.assertRaises(VersionException):
+            decode_multidata(bytes(data))
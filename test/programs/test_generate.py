@@ -1,5 +1,6 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import json
 import unittest
 import os
 import os.path
@@ -72,6 +73,25 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile(self):
+        sys.argv = [sys.argv[0], '--seed', '0', '--profile',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        profile_file = Path(self.output_tempdir.name) / f"AP_{multiworld.seed_name}_profile.json"
+        with open(profile_file, encoding="utf-8") as f:
+            profile = json.load(f)
+        stage_names = [stage["name"] for stage in profile["stages"]]
+        for stage_name in ("generate_early", "fill", "output", "write_multidata", "zip"):
+            self.assertIn(stage_name, stage_names)
+        self.assertEqual({"1"}, set(profile["slots"]))
+        self.assertIn("create_regions", profile["slots"]["1"]["calls"])
+        self.assertGreater(profile["sweeps"], 0)
+        self.assertGreater(profile["reachable_region_updates"], 0)
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +128,7 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile = None
 
     def test_generate_yaml(self):
         from settings import get_settings
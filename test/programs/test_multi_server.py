@@ -1,5 +1,15 @@
+import asyncio
+import os
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import zlib
+from unittest.mock import patch
+
+import MultiServer
+from MultiServer import (Client, Context, ServerCommandProcessor, build_game_tables, collect_player, send_items_to,
+                         send_new_items)
+from NetUtils import ClientStatus, Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType
+from Utils import restricted_loads
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +48,277 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class SaveContext(Context):
+    def _load_game_data(self) -> None:
+        pass  # saving does not need any game data
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        from tempfile import TemporaryDirectory
+
+        self.tempdir = TemporaryDirectory()
+        self.save_filename = os.path.join(self.tempdir.name, "test.apsave")
+        self.ctx = self.make_context()
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def make_context(self) -> Context:
+        ctx = SaveContext("", 0, "", "", 0, 0, False, save_journal=True)
+        ctx.save_filename = self.save_filename
+        ctx.saving = True
+        return ctx
+
+    def load(self) -> Context:
+        ctx = self.make_context()
+        save_data = restricted_loads(zlib.decompress(open(self.save_filename, "rb").read()))
+        ctx.set_save(ctx.save_journal.load(save_data, 1, ctx._read_save_journal()))
+        return ctx
+
+    def test_journal_replays_to_same_save(self) -> None:
+        """Test that a snapshot with the journal replayed onto it gives the same save as writing it whole"""
+        ctx = self.ctx
+        ctx.received_items[0, 1, True] = [NetworkItem(1, 2, 1, 0)]
+        ctx.location_checks[0, 2] = {2}
+        ctx.name_aliases[0, 1] = "Alias"
+        self.assertTrue(ctx._save())
+        snapshot_size = os.path.getsize(self.save_filename)
+
+        ctx.received_items[0, 1, True].append(NetworkItem(3, 2, 1, 0))
+        ctx.location_checks[0, 2].add(3)
+        ctx.client_game_state[0, 1] = ClientStatus.CLIENT_GOAL
+        del ctx.name_aliases[0, 1]
+        ctx.stored_data["key"] = [1]
+        ctx.save_journal.changed_stored_data.add("key")
+        self.assertTrue(ctx._save())
+        ctx.stored_data["key"].append(2)
+        ctx.save_journal.changed_stored_data.add("key")
+        self.assertTrue(ctx._save())
+        self.assertTrue(ctx._save())  # nothing changed, so nothing to record
+
+        self.assertEqual(snapshot_size, os.path.getsize(self.save_filename))
+        self.assertEqual(2, len(ctx._read_save_journal()))
+        loaded = self.load()
+        expected, actual = ctx.get_save(), loaded.get_save()
+        del expected["random_state"], actual["random_state"]
+        self.assertEqual(expected, actual)
+
+    def test_stale_journal_ignored(self) -> None:
+        """Test that records of an older snapshot are not replayed onto a newer one"""
+        ctx = self.ctx
+        self.assertTrue(ctx._save())
+        ctx.location_checks[0, 1] = {1}
+        self.assertTrue(ctx._save())
+        journal = ctx._read_save_journal()
+        self.assertTrue(ctx._save(exit_save=True))
+        with open(ctx.save_journal_filename, "ab") as f:
+            for record in journal:
+                f.write(len(record).to_bytes(4, "little") + record)
+        ctx.location_checks[0, 1] = set()
+        self.assertTrue(ctx._save(exit_save=True))
+        with open(ctx.save_journal_filename, "ab") as f:
+            for record in journal:
+                f.write(len(record).to_bytes(4, "little") + record)
+            f.write(b"\xff\x00")  # record cut short
+        self.assertEqual(set(), self.load().location_checks[0, 1])
+
+
+class TestHintIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ctx = SaveContext("", 0, "", "", 0, 0, False)
+        self.ctx.groups = {3: {1, 2}}
+        hints = [
+            Hint(1, 2, 20, 1, False, status=HintStatus.HINT_PRIORITY),
+            Hint(3, 2, 21, 2, False, status=HintStatus.HINT_PRIORITY),
+            Hint(2, 1, 10, 3, False, status=HintStatus.HINT_PRIORITY),
+        ]
+        for hint in hints:
+            for slot in self.ctx.slot_set(hint.receiving_player) | {hint.finding_player}:
+                self.ctx.hints[0, slot].add(hint)
+        self.ctx.rebuild_hint_index()
+
+    def test_get_hint(self) -> None:
+        """Test that hints are found by their finding player and location"""
+        self.assertEqual(Hint(3, 2, 21, 2, False, status=HintStatus.HINT_PRIORITY), self.ctx.get_hint(0, 2, 21))
+        self.assertIsNone(self.ctx.get_hint(0, 1, 21))
+        self.assertIsNone(self.ctx.get_hint(1, 2, 21))
+
+    def test_location_recheck_matches_full_recheck(self) -> None:
+        """Test that rechecking hints of checked locations gives the same hints as rechecking all hints"""
+        ctx = self.ctx
+        ctx.location_checks[0, 2] = {21}
+        changed = set()
+        ctx.recheck_location_hints(0, 2, {21}, changed)
+        self.assertEqual({(0, 1), (0, 2)}, changed)
+        self.assertTrue(ctx.get_hint(0, 2, 21).found)
+        self.assertFalse(ctx.get_hint(0, 2, 20).found)
+
+        indexed = {key: set(hints) for key, hints in ctx.hints.items()}
+        ctx.recheck_hints()
+        self.assertEqual(ctx.hints, indexed)
+
+    def test_replace_hint(self) -> None:
+        """Test that replacing a hint for its finding player updates the index"""
+        hint = self.ctx.get_hint(0, 1, 10)
+        new_hint = hint.re_prioritize(self.ctx, HintStatus.HINT_AVOID)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, hint, new_hint)
+        self.assertEqual(HintStatus.HINT_AVOID, self.ctx.get_hint(0, 1, 10).status)
+        self.assertEqual({(0, 2, 20), (0, 2, 21), (0, 1, 10)}, set(self.ctx.hint_index))
+
+
+class TestDataPackage(unittest.TestCase):
+    @patch.dict(MultiServer.encoded_game_packages)
+    def test_encoded_matches_dumper(self) -> None:
+        """Test that DataPackage messages joined from encoded game packages match encoding the whole message"""
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {
+            "Game": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Lócation": 2}, "checksum": "test"},
+            "Old Game": {"item_name_to_id": {}, "location_name_to_id": {"Location": 1}},
+        }
+        for games in ([], ["Game"], ["Game", "Old Game"]):
+            with self.subTest(games=games):
+                message = [{"cmd": "DataPackage", "data": {"games": {game: ctx.gamespackage[game] for game in games}}}]
+                self.assertEqual(ctx.dumper(message), ctx.encode_data_package(games))
+        self.assertIn(("Game", "test"), MultiServer.encoded_game_packages)
+        self.assertEqual({"Old Game"}, set(ctx.encoded_game_packages))
+
+
+class RecordingSocket:
+    open = True
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, msg: str) -> None:
+        self.sent.append(msg)
+
+
+class TestOutboundBatching(unittest.TestCase):
+    def test_messages_combined_in_order(self) -> None:
+        """Test that messages queued within the window reach each client as one frame, in the order they were sent"""
+        ctx = SaveContext("", 0, "", "", 0, 0, False, outbound_batch_ms=20)
+        first, second = Client(RecordingSocket(), ctx), Client(RecordingSocket(), ctx)
+
+        async def send() -> None:
+            await ctx.send_msgs(first, [{"cmd": "A"}])
+            await ctx.broadcast_send_encoded_msgs([first, second], ctx.dumper([{"cmd": "B"}, {"cmd": "C"}]))
+            await ctx.send_encoded_msgs(first, "[]")
+            await ctx.send_msgs(first, [{"cmd": "D"}])
+            self.assertEqual([], first.socket.sent)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(send())
+        self.assertEqual([ctx.dumper([{"cmd": "A"}, {"cmd": "B"}, {"cmd": "C"}, {"cmd": "D"}])], first.socket.sent)
+        self.assertEqual([ctx.dumper([{"cmd": "B"}, {"cmd": "C"}])], second.socket.sent)
+        self.assertEqual({"messages": 5, "frames": 2}, ctx.outbound_counts)
+
+
+class TestSendNewItems(unittest.TestCase):
+    def test_only_receiving_slots_sent(self) -> None:
+        """Test that ReceivedItems goes only to the clients of slots that received something"""
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.groups = {3: {1, 2}}
+        clients = {slot: Client(RecordingSocket(), ctx) for slot in (1, 2, 4)}
+        for client in clients.values():
+            client.items_handling = 0b111
+        ctx.clients = {0: {slot: [client] for slot, client in clients.items()}}
+
+        async def send() -> None:
+            send_items_to(ctx, 0, 1, NetworkItem(1, 1, 2))
+            send_items_to(ctx, 0, 3, NetworkItem(2, 2, 4))
+            send_new_items(ctx)
+            await asyncio.sleep(0)
+
+        asyncio.run(send())
+        self.assertEqual(set(), ctx.new_item_slots)
+        self.assertEqual([ctx.dumper([{"cmd": "ReceivedItems", "index": 0,
+                                       "items": [NetworkItem(1, 1, 2), NetworkItem(2, 2, 4)]}])],
+                         clients[1].socket.sent)
+        self.assertEqual([ctx.dumper([{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(2, 2, 4)]}])],
+                         clients[2].socket.sent)
+        self.assertEqual([], clients[4].socket.sent)
+
+
+class TestCollect(unittest.TestCase):
+    def test_collect_sends_once(self) -> None:
+        """Test that collecting from many slots sends each affected slot a single update"""
+        ctx = SaveContext("", 0, "", "", 0, 0, False, outbound_batch_ms=1)  # batched to record broadcasts
+        ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 2, 0)}, 2: {20: (200, 1, 0)},
+                                       3: {30: (300, 2, 0), 31: (301, 1, 0)}})
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2, 3)}
+        ctx.player_names = {(0, slot): f"Player{slot}" for slot in (1, 2, 3)}
+        clients = {slot: Client(RecordingSocket(), ctx) for slot in (1, 2, 3)}
+        for client in clients.values():
+            client.items_handling = 0b111
+        ctx.clients = {0: {slot: [client] for slot, client in clients.items()}}
+
+        async def collect() -> None:
+            collect_player(ctx, 0, 2)
+            await asyncio.sleep(0.05)
+
+        def sent(slot: int, cmd: str) -> typing.List[dict]:
+            return [msg for frame in clients[slot].socket.sent for msg in ctx.loader(frame) if msg["cmd"] == cmd]
+
+        asyncio.run(collect())
+        self.assertEqual({10, 11}, ctx.location_checks[0, 1])
+        self.assertEqual({30}, ctx.location_checks[0, 3])
+        self.assertEqual([[NetworkItem(100, 10, 1), NetworkItem(101, 11, 1), NetworkItem(300, 30, 3)]],
+                         [msg["items"] for msg in sent(2, "ReceivedItems")])
+        self.assertEqual([], sent(2, "RoomUpdate"))
+        for slot, checked in ((1, [10, 11]), (3, [30])):
+            self.assertEqual([checked], [sorted(msg["checked_locations"]) for msg in sent(slot, "RoomUpdate")])
+        self.assertEqual(3, len(sent(1, "PrintJSON")))  # one ItemSend for each item
+
+    def test_collect_nothing_new(self) -> None:
+        """Test that collecting without new checks still sends each source slot its checked locations"""
+        ctx = SaveContext("", 0, "", "", 0, 0, False, outbound_batch_ms=1)  # batched to record broadcasts
+        ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 2, 0)}, 2: {20: (200, 1, 0)}})
+        ctx.slot_info = {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player) for slot in (1, 2)}
+        ctx.player_names = {(0, slot): f"Player{slot}" for slot in (1, 2)}
+        clients = {slot: Client(RecordingSocket(), ctx) for slot in (1, 2)}
+        ctx.clients = {0: {slot: [client] for slot, client in clients.items()}}
+        ctx.location_checks[0, 1] = {10, 11}
+
+        async def collect() -> None:
+            collect_player(ctx, 0, 2)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(collect())
+        updates = [msg for frame in clients[1].socket.sent for msg in ctx.loader(frame) if msg["cmd"] == "RoomUpdate"]
+        self.assertEqual([[10, 11]], [sorted(msg["checked_locations"]) for msg in updates])
+        self.assertEqual({10, 11}, ctx.location_checks[0, 1])
+
+
+class TestGameTables(unittest.TestCase):
+    def test_prepared_tables_shared(self) -> None:
+        """Test that games with a prepared data package share its tables, and other games get their own"""
+        archipelago = {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {"Cheat Console": -1}}
+        game = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}, "checksum": "static"}
+        item_name_groups = {"Archipelago": {}, "Game": {"Group": {"Item"}}}
+        prepared = build_game_tables({"Archipelago": archipelago, "Game": game}, item_name_groups, {})
+
+        custom_game = {"item_name_to_id": {"Custom Item": 1}, "location_name_to_id": {}, "checksum": "custom"}
+        tables = build_game_tables({"Archipelago": archipelago, "Game": custom_game}, item_name_groups, {}, prepared)
+        self.assertIs(prepared["item_names"]["Archipelago"], tables["item_names"]["Archipelago"])
+        self.assertEqual({1: "Custom Item", -1: "Nothing"}, tables["item_names"]["Game"])
+        self.assertEqual({1: "Item", -1: "Nothing"}, prepared["item_names"]["Game"])
+        self.assertEqual({"Custom Item", "Group"}, tables["all_item_and_group_names"]["Game"])
+        self.assertEqual({"Game": "custom"}, tables["checksums"])
+
+        tables = build_game_tables({"Game": game}, item_name_groups, {}, prepared)
+        self.assertIs(prepared["location_names"]["Game"], tables["location_names"]["Game"])
+        self.assertEqual({"Game": "static"}, tables["checksums"])
+
+    def test_unknown_ids_not_added(self) -> None:
+        """Test that looking up unknown ids in shared name tables leaves them unchanged"""
+        game = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}, "checksum": "static"}
+        prepared = build_game_tables({"Game": game}, {"Game": {}}, {})
+        tables = build_game_tables({"Game": game}, {"Game": {}}, {}, prepared)
+        self.assertEqual("Unknown item (ID:5)", tables["item_names"]["Game"][5])
+        self.assertEqual("Unknown location (ID:6)", tables["location_names"]["Game"][6])
+        self.assertEqual({1: "Item"}, prepared["item_names"]["Game"])
+        self.assertEqual({2: "Location"}, prepared["location_names"]["Game"])
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import time
+import typing
+import unittest
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+def _sleeping_generator(config: typing.Dict[str, typing.Any], connection, max_jobs: int) -> None:
+    """Stand-in for a generator process, sleeping for the "sleep" meta of each job and replying with its sid."""
+    for _ in range(max_jobs):
+        sid, options, meta, owner, output_dir = connection.recv()
+        with open(os.path.join(output_dir, "output.txt"), "w") as f:
+            f.write(str(sid))
+        time.sleep(meta["sleep"])
+        connection.send(sid)
+
+
+class _MissedPoll:
+    """Connection whose first poll misses the reply, as if the generator replied right after it."""
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+        self.missed = False
+
+    def poll(self) -> bool:
+        if not self.missed:
+            self.missed = True
+            return False
+        return self.connection.poll()
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.connection, name)
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+class TestGenerationScheduler(TestBase):
+    config = {"JOB_TIME": 2, "LARGE_GENERATION_COST": 5, "GENERATORS": 2}
+
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import GenerationScheduler
+
+        super().setUp()
+        self.scheduler = GenerationScheduler(self.config, multiprocessing.get_context("fork"), _sleeping_generator)
+
+    def tearDown(self) -> None:
+        self.scheduler.stop()
+
+    def run_until(self, condition: typing.Callable[[], bool], timeout: float = 10) -> None:
+        end = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), end, "timed out")
+            self.scheduler.update()
+            time.sleep(0.05)
+
+    def test_estimate(self) -> None:
+        """Verify that players and different games both add to the estimated cost."""
+        from WebHostLib.autolauncher import estimate_generation_cost
+
+        self.assertEqual(2, estimate_generation_cost({"1": {"game": "A"}}))
+        self.assertEqual(3, estimate_generation_cost({"1": {"game": "A"}, "2": {"game": "A"}}))
+        self.assertEqual(4, estimate_generation_cost({"1": {"game": "A"}, "2": {"game": "B"}}))
+
+    def test_lanes(self) -> None:
+        """Verify that large jobs only get up to half the generators, leaving the rest for small jobs."""
+        large_options = {str(player): {"game": str(player)} for player in range(3)}
+        large = [uuid4(), uuid4()]
+        for sid in large:
+            self.scheduler.submit(sid, large_options, {"sleep": 0.5}, uuid4())
+        small = uuid4()
+        self.scheduler.submit(small, {"1": {"game": "A"}}, {"sleep": 0}, uuid4())
+        self.scheduler.update()
+        self.assertEqual({large[0], small}, {worker.job.sid for worker in self.scheduler.workers if worker.job})
+        output_dirs = [worker.output_dir for worker in self.scheduler.workers]
+        self.run_until(lambda: not self.scheduler.lanes[True])  # second large job starts after the first
+        self.run_until(lambda: not any(worker.job for worker in self.scheduler.workers))
+        for output_dir in output_dirs:
+            self.assertFalse(os.path.exists(output_dir))
+
+    def test_timeout(self) -> None:
+        """Verify that a job running over the job time gets its generator killed and replaced, failing the job and
+        removing its output."""
+        import json
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_STARTED
+
+        with db_session:
+            sid: UUID = Generation(options=b"", meta=json.dumps({}), state=STATE_STARTED, owner=uuid4()).id
+        self.scheduler.submit(sid, {"1": {"game": "A"}}, {"sleep": 60}, uuid4())
+        self.scheduler.update()
+        process, output_dir = next((worker.process, worker.output_dir) for worker in self.scheduler.workers
+                                   if worker.job)
+        self.run_until(lambda: os.path.exists(os.path.join(output_dir, "output.txt")))
+        self.run_until(lambda: not any(worker.job for worker in self.scheduler.workers))
+        self.assertFalse(process.is_alive())
+        self.assertFalse(os.path.exists(output_dir))
+        self.assertNotIn(process, [worker.process for worker in self.scheduler.workers])
+        self.assertTrue(all(worker.process.is_alive() for worker in self.scheduler.workers))
+        with db_session:
+            generation = Generation.get(id=sid)
+            self.assertEqual(STATE_ERROR, generation.state)
+            self.assertIn("Allowed time for Generation exceeded", json.loads(generation.meta)["error"])
+            generation.delete()
+
+    def test_reply_before_exit(self) -> None:
+        """Verify that a generator replying and then exiting between the scheduler's checks still finishes its job."""
+        import json
+        from unittest.mock import patch
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import GeneratorWorker
+        from WebHostLib.models import Generation, STATE_STARTED
+
+        with db_session:
+            sid: UUID = Generation(options=b"", meta=json.dumps({}), state=STATE_STARTED, owner=uuid4()).id
+        self.scheduler.stop()
+        with patch.object(GeneratorWorker, "max_jobs", 1):
+            self.scheduler.workers = [self.scheduler._start_worker() for _ in self.scheduler.workers]
+            self.scheduler.submit(sid, {"1": {"game": "A"}}, {"sleep": 0}, uuid4())
+            self.scheduler.update()
+            worker = next(worker for worker in self.scheduler.workers if worker.job)
+            worker.process.join(10)
+            self.assertFalse(worker.process.is_alive())
+            worker.connection = _MissedPoll(worker.connection)
+            self.scheduler.update()
+        self.assertIsNone(worker.job)
+        self.assertNotIn(worker, self.scheduler.workers)
+        with db_session:
+            generation = Generation.get(id=sid)
+            self.assertEqual(STATE_STARTED, generation.state)
+            generation.delete()
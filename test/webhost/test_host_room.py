@@ -191,3 +191,36 @@ class TestHostFakeRoom(TestBase):
         with db_session:
             commands = select(command for command in Command if command.room.id == self.room_id)  # type: ignore
             self.assertNotIn("/help", (command.commandtext for command in commands))
+
+    def test_command_dispatcher(self) -> None:
+        """Verify queued commands of running rooms get handed to their room's event loop and removed."""
+        from types import SimpleNamespace
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import CommandDispatcher
+        from WebHostLib.models import Command, Room
+
+        with db_session:
+            seed = Room.get(id=self.room_id).seed
+            other_room = Room(seed=seed, owner=seed.owner, tracker=uuid4())
+            Command(room=Room.get(id=self.room_id), commandtext="/help")
+            Command(room=other_room, commandtext="/options")
+            other_room_id = other_room.id
+
+        calls = []
+        ctx = SimpleNamespace(room_id=self.room_id,
+                              main_loop=SimpleNamespace(call_soon_threadsafe=lambda *args: calls.append(args)))
+        dispatcher = CommandDispatcher()
+        dispatcher.dispatch()  # no rooms, nothing to do
+        dispatcher.add_room(ctx)  # type: ignore
+        dispatcher.dispatch()
+        self.assertEqual(["/help"], [text for cmdprocessor, text in calls])
+        self.assertIs(ctx, calls[0][0].ctx)
+
+        with db_session:
+            self.assertFalse(select(command for command in Command if command.room.id == self.room_id)[:])
+            # commands of rooms not running in this process are left alone
+            commands = select(command for command in Command if command.room.id == other_room_id)
+            self.assertEqual(["/options"], [command.commandtext for command in commands])
+            commands.delete(bulk=True)
+            Room.get(id=other_room_id).delete()
+        dispatcher.remove_room(self.room_id)
@@ -0,0 +1,83 @@
+import datetime
+import typing
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+class FakeHoster:
+    def __init__(self) -> None:
+        self.started: typing.List[UUID] = []
+        self.shut_down: typing.List[UUID] = []
+
+    def collect_shut_down_rooms(self) -> typing.List[UUID]:
+        shut_down, self.shut_down = self.shut_down, []
+        return shut_down
+
+    def start_room(self, room_id: UUID) -> None:
+        self.started.append(room_id)
+
+
+class TestRoomScheduler(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        owner = uuid4()
+        self.now = datetime.datetime.utcnow()
+        with db_session:
+            seed = Seed(multidata=b"", owner=owner)
+            self.active_room = Room(seed=seed, owner=owner, tracker=uuid4(), last_activity=self.now).id
+            self.timed_out_room = Room(seed=seed, owner=owner, tracker=uuid4(),
+                                       last_activity=self.now - datetime.timedelta(days=1)).id
+            self.seed = seed.id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        with db_session:
+            seed = Seed.get(id=self.seed)
+            seed.rooms.clear()
+            seed.delete()
+
+    def test_starts_active_rooms(self) -> None:
+        """Verify only rooms within their timeout get started, and only changed rooms are checked after the first."""
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import Room
+
+        hoster = FakeHoster()
+        scheduler = RoomScheduler([hoster])  # type: ignore
+        scheduler.update()
+        self.assertIn(self.active_room, hoster.started)
+        self.assertNotIn(self.timed_out_room, hoster.started)
+
+        # activity long ago is only looked at again by the full check
+        with db_session:
+            Room.get(id=self.active_room).last_activity = self.now - datetime.timedelta(minutes=30)
+        scheduler.last_check = self.now + datetime.timedelta(minutes=1)
+        hoster.started.clear()
+        scheduler.update()
+        self.assertEqual([], hoster.started)
+
+        # new activity is picked up
+        with db_session:
+            Room.get(id=self.timed_out_room).last_activity = datetime.datetime.utcnow()
+        scheduler.last_check = self.now
+        scheduler.update()
+        self.assertEqual([self.timed_out_room], hoster.started)
+
+    def test_restarts_shut_down_rooms(self) -> None:
+        """Verify a room that shut down is started again if it is still active."""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        hoster = FakeHoster()
+        scheduler = RoomScheduler([hoster])  # type: ignore
+        scheduler.update()
+        hoster.started.clear()
+        scheduler.last_check = self.now + datetime.timedelta(minutes=1)  # no new activity since
+        hoster.shut_down = [self.active_room, self.timed_out_room]
+        scheduler.update()
+        self.assertEqual([self.active_room], hoster.started)
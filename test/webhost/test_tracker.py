@@ -103,3 +103,98 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_decoded_cache(self) -> None:
+        """Verify that decoded seeds are kept between requests and saves are decoded again after room activity."""
+        import datetime
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+        with db_session:
+            first = TrackerData(Room.get(id=self.room_id))
+            second = TrackerData(Room.get(id=self.room_id))
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first.item_id_to_name, second.item_id_to_name)
+            self.assertIs(first._multisave, second._multisave)
+            self.assertEqual({1}, second.get_player_checked_locations(0, 1))
+
+            room = Room.get(id=self.room_id)
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1, 2}}})
+            room.last_activity = datetime.datetime.utcnow() + datetime.timedelta(seconds=1)
+        with db_session:
+            third = TrackerData(Room.get(id=self.room_id))
+            self.assertIs(first._multidata, third._multidata)
+            self.assertEqual({1, 2}, third.get_player_checked_locations(0, 1))
+
+    def test_cached_lookups_unchanged(self) -> None:
+        """Verify that looking up unknown games and ids does not add them to the shared lookups."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            tracker_data = TrackerData(Room.get(id=self.room_id))
+            item_id_to_name = tracker_data.item_id_to_name
+            games = set(item_id_to_name)
+            items = dict(item_id_to_name["Archipelago"])
+            self.assertEqual("Unknown Item (ID: 123456789)", item_id_to_name["Archipelago"][123456789])
+            self.assertIn("Unknown Game", str(item_id_to_name["Unknown Game"]))
+            self.assertEqual(games, set(item_id_to_name))
+            self.assertEqual(items, item_id_to_name["Archipelago"])
+
+    def test_decoded_cache_size(self) -> None:
+        """Verify that the least recently used entries are dropped once over the size limit."""
+        from WebHostLib.tracker import DecodedCache
+
+        cache: DecodedCache[str] = DecodedCache(10)
+        cache.get("a", None, lambda: (4, "a"))
+        cache.get("b", None, lambda: (4, "b"))
+        self.assertEqual("a", cache.get("a", None, lambda: (4, "new a")))  # hit, making b the least recently used
+        cache.get("c", None, lambda: (4, "c"))
+        self.assertEqual(8, cache.size)
+        self.assertEqual("a", cache.get("a", None, lambda: (4, "new a")))
+        self.assertEqual("new b", cache.get("b", None, lambda: (4, "new b")))
+        self.assertEqual("newer b", cache.get("b", 1, lambda: (4, "newer b")))  # other version
+        self.assertEqual("too big", cache.get("d", None, lambda: (11, "too big")))
+        self.assertEqual("too big again", cache.get("d", None, lambda: (11, "too big again")))
+        self.assertEqual(8, cache.size)
+
+    def test_tracker_summary(self) -> None:
+        """Verify that counts are read from the room's tracker summary, without decoding its save."""
+        import datetime
+        from types import SimpleNamespace
+        from pony.orm import db_session
+        from NetUtils import ClientStatus, NetworkItem
+        from WebHostLib.customserver import WebHostContext
+        from WebHostLib.models import Room, TrackerSummary
+        from WebHostLib.tracker import TrackerData
+
+        ctx = SimpleNamespace(
+            received_items={(0, 1, True): [NetworkItem(5, 1, 1, 0)], (0, 1, False): [NetworkItem(6, 1, 1, 0)]},
+            location_checks={(0, 1): {1, 2}},
+            client_game_state={(0, 1): ClientStatus.CLIENT_GOAL},
+            client_activity_timers={(0, 1): datetime.datetime.now(datetime.timezone.utc)},
+            tracker_received_counts={},
+            tracker_received_counted={},
+        )
+        WebHostContext.get_tracker_summary(ctx)  # type: ignore
+        ctx.received_items[0, 1, True].append(NetworkItem(5, 2, 1, 0))
+        summary = WebHostContext.get_tracker_summary(ctx)  # type: ignore
+        self.assertEqual({(0, 1): {5: 2}}, summary["received"])
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.multisave = b"not a save"  # would fail to decode
+            TrackerSummary(room=room, data=pickle.dumps(summary))
+            room.last_activity = datetime.datetime.utcnow() + datetime.timedelta(seconds=2)
+        with db_session:
+            tracker_data = TrackerData(Room.get(id=self.room_id))
+            self.assertEqual(2, tracker_data.get_player_checked_count(0, 1))
+            self.assertEqual(2, tracker_data.get_player_inventory_counts(0, 1)[5])
+            self.assertIs(ClientStatus.CLIENT_GOAL, tracker_data.get_player_client_status(0, 1))
+            self.assertIn((0, 1), tracker_data.get_room_last_activity())
+            self.assertNotIn("_multisave", tracker_data.__dict__)
@@ -0,0 +1,109 @@
+from pathlib import Path
+from typing import ClassVar
+from uuid import uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+class TestUpload(TestBase):
+    data: ClassVar[bytes]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        from NetUtils import decode_multidata, encode_multidata
+
+        super().setUpClass()
+        with (Path(__file__).parent / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            # upgrade to the latest format, which can be passed through without decoding every section
+            cls.data = encode_multidata(decode_multidata(f.read()))
+
+    def test_strip_once(self) -> None:
+        """Verify that data packages are split out, and multidata only holding checksums is kept as uploaded."""
+        from pony.orm import db_session, rollback
+        from NetUtils import decode_multidata
+        from WebHostLib.models import GameDataPackage
+        from WebHostLib.upload import process_multidata
+
+        with db_session:
+            slots, stripped = process_multidata(self.data)
+            for game, game_data in decode_multidata(stripped)["datapackage"].items():
+                self.assertEqual({"version", "checksum"}, set(game_data))
+                self.assertTrue(GameDataPackage.exists(checksum=game_data["checksum"]))
+            again_slots, again = process_multidata(stripped)
+            self.assertIs(stripped, again)
+            self.assertEqual({slot.player_name for slot in slots}, {slot.player_name for slot in again_slots})
+            rollback()
+
+    def test_queued_upload(self) -> None:
+        """Verify that large uploads are queued for the generators, which store them as a seed."""
+        from io import BytesIO
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, Seed, STATE_QUEUED
+        from WebHostLib.upload import process_queued_upload
+
+        threshold = self.app.config["UPLOAD_JOB_THRESHOLD"]
+        self.app.config["UPLOAD_JOB_THRESHOLD"] = 0
+        try:
+            with self.app.test_request_context():
+                response = self.client.post(url_for("uploads"), data={
+                    "file": (BytesIO(self.data), "AP_1.archipelago"),
+                })
+        finally:
+            self.app.config["UPLOAD_JOB_THRESHOLD"] = threshold
+        self.assertEqual(302, response.status_code)
+        self.assertIn("/wait/", response.headers["Location"])
+        with db_session, self.app.test_request_context():
+            generation = next(generation for generation in Generation.select()
+                              if response.headers["Location"] == url_for("wait_seed", seed=generation.id))
+            self.assertEqual(STATE_QUEUED, generation.state)
+            sid, owner, data = generation.id, generation.owner, generation.options
+        self.assertEqual(self.data, data)
+
+        self.assertEqual(sid, process_queued_upload(data, owner, sid))
+        with db_session:
+            self.assertIsNone(Generation.get(id=sid))
+            seed = Seed[sid]
+            self.assertEqual(1, len(seed.slots))
+            seed.slots.clear()
+            seed.delete()
+
+    def test_queued_upload_error(self) -> None:
+        """Verify that a failing queued upload is recorded on its generation."""
+        import json
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_STARTED
+        from WebHostLib.upload import process_queued_upload
+
+        with db_session:
+            sid = Generation(options=b"", meta=json.dumps({"upload": True}), state=STATE_STARTED, owner=uuid4()).id
+        self.assertIsNone(process_queued_upload(b"\x03not multidata", uuid4(), sid))
+        with db_session:
+            generation = Generation[sid]
+            self.assertEqual(STATE_ERROR, generation.state)
+            self.assertIn("Could not load multidata", json.loads(generation.meta)["error"])
+            generation.delete()
+
+    def test_queued_upload_zip_error(self) -> None:
+        """Verify that errors of a queued .zip upload are recorded on its generation, without markup."""
+        import json
+        import zipfile
+        from io import BytesIO
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_STARTED
+        from WebHostLib.upload import process_queued_upload
+
+        data = BytesIO()
+        with zipfile.ZipFile(data, "w") as zfile:
+            zfile.writestr("Player1.yaml", "name: Player1")
+        with db_session:
+            sid = Generation(options=b"", meta=json.dumps({"upload": True}), state=STATE_STARTED, owner=uuid4()).id
+        self.assertIsNone(process_queued_upload(data.getvalue(), uuid4(), sid))
+        with db_session:
+            generation = Generation[sid]
+            self.assertEqual(STATE_ERROR, generation.state)
+            error = json.loads(generation.meta)["error"]
+            self.assertIn("only contains options files", error)
+            self.assertNotIn("<a", error)
+            generation.delete()
@@ -12,7 +12,7 @@ from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Ma
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
-from Utils import Version
+from Utils import GenerationProfiler, Version
 
 if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
@@ -160,9 +160,15 @@ class WebWorldRegister(type):
 
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
-    start = time.perf_counter()
+    start, cpu_start = time.perf_counter(), time.thread_time()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if GenerationProfiler.active:
+        if player and multiworld:
+            game = multiworld.game[player]
+        else:  # stage methods are classmethods of the world class
+            game = getattr(getattr(method, "__self__", None), "game", "")
+        GenerationProfiler.active.record_call(player, game, method.__name__, taken, time.thread_time() - cpu_start)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -314,6 +320,13 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    item_dependency_index: bool = False
+    """If True, CollectionState records which items the access rules of this world's blocked entrances read, and only
+    re-evaluates the entrances affected by newly collected items instead of all blocked entrances.
+    This requires explicit_indirect_conditions, and entrance rules that only depend on this world's own items, read
+    through CollectionState's has/count methods or state.prog_items[player][item], and on registered indirect
+    conditions. Rules depending on LogicMixin attributes or other players' items must not enable this."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
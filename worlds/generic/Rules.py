@@ -1,4 +1,6 @@
+import abc
 import collections
+import dataclasses
 import logging
 import typing
 
@@ -96,12 +98,269 @@ def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typi
                 logging.warning(f"Unable to exclude location {loc_name} in player {player}'s world.")
 
 
-def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule):
-    spot.access_rule = rule
+class Rule(abc.ABC):
+    """
+    Base of the access rule IR. Rules can be combined with `&` and `|` and passed to `set_rule` and `add_rule`, which
+    simplify and compile them into a single flat function instead of a chain of lambdas. The compiled function keeps
+    the rule it was compiled from as `rule`, and the items it depends on as `item_requirements`.
+    Calling a rule directly compiles it on first use.
+    """
+    __slots__ = ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return self.compile()(state)
+
+    def __and__(self, other: "Rule") -> "Rule":
+        return And(self, other)
+
+    def __or__(self, other: "Rule") -> "Rule":
+        return Or(self, other)
+
+    @abc.abstractmethod
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        """Evaluates the rule by walking it, without compiling."""
+
+    def simplify(self) -> "Rule":
+        """Returns an equivalent, possibly smaller, rule."""
+        return self
+
+    def item_requirements(self) -> typing.Dict[int, typing.Set[str]]:
+        """Returns the item names per player that this rule reads."""
+        return {}
+
+    @abc.abstractmethod
+    def _expression(self) -> str:
+        """Python expression of this rule, reading items of player p from the local `items_p`."""
+
+    def compile(self) -> CollectionRule:
+        """Returns a function equivalent to this rule, which is cached on the rule."""
+        compiled = getattr(self, "_compiled", None)
+        if compiled is None:
+            rule = self.simplify()
+            lines = ["def access_rule(state):"]
+            lines += [f"    items_{player} = state.prog_items[{player}]" for player in rule.item_requirements()]
+            lines.append(f"    return {rule._expression()}")
+            namespace: typing.Dict[str, typing.Any] = {}
+            exec(compile("\n".join(lines), f"<rule {rule!r}>", "exec"), namespace)
+            compiled = namespace["access_rule"]
+            compiled.rule = rule
+            compiled.item_requirements = rule.item_requirements()
+            object.__setattr__(self, "_compiled", compiled)
+        return compiled
+
+
+@dataclasses.dataclass(frozen=True)
+class Has(Rule):
+    """Requires at least count of item."""
+    item: str
+    player: int
+    count: int = 1
+    _compiled: typing.Optional[CollectionRule] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has(self.item, self.player, self.count)
+
+    def simplify(self) -> Rule:
+        return self if self.count > 0 else And()
+
+    def item_requirements(self) -> typing.Dict[int, typing.Set[str]]:
+        return {self.player: {self.item}}
+
+    def _expression(self) -> str:
+        return f"items_{self.player}[{self.item!r}] >= {self.count}"
+
+
+@dataclasses.dataclass(frozen=True)
+class HasAll(Rule):
+    """Requires at least one of each of items."""
+    items: typing.Tuple[str, ...]
+    player: int
+    _compiled: typing.Optional[CollectionRule] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "items", tuple(self.items))
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has_all(self.items, self.player)
+
+    def simplify(self) -> Rule:
+        return And(*(Has(item, self.player) for item in self.items)).simplify()
+
+    def item_requirements(self) -> typing.Dict[int, typing.Set[str]]:
+        return {self.player: set(self.items)}
+
+    def _expression(self) -> str:
+        return " and ".join(f"items_{self.player}[{item!r}] >= 1" for item in self.items) or "True"
+
+
+@dataclasses.dataclass(frozen=True)
+class Count(Rule):
+    """Requires at least count items in total out of items, like `CollectionState.has_from_list`."""
+    items: typing.Tuple[str, ...]
+    player: int
+    count: int
+    _compiled: typing.Optional[CollectionRule] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "items", tuple(self.items))
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.has_from_list(self.items, self.player, self.count)
+
+    def simplify(self) -> Rule:
+        if self.count <= 0:
+            return And()
+        if not self.items:
+            return Or()
+        if len(self.items) == 1:
+            return Has(self.items[0], self.player, self.count)
+        return self
+
+    def item_requirements(self) -> typing.Dict[int, typing.Set[str]]:
+        return {self.player: set(self.items)}
+
+    def _expression(self) -> str:
+        return f"{' + '.join(f'items_{self.player}[{item!r}]' for item in self.items)} >= {self.count}"
+
+
+@dataclasses.dataclass(frozen=True)
+class CanReach(Rule):
+    """Requires the named Region, Location or Entrance to be reachable, see `CollectionState.can_reach`."""
+    spot: str
+    player: int
+    resolution_hint: str = "Region"
+    _compiled: typing.Optional[CollectionRule] = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.can_reach(self.spot, self.resolution_hint, self.player)
+
+    def _expression(self) -> str:
+        return f"state.can_reach({self.spot!r}, {self.resolution_hint!r}, {self.player})"
+
+
+class _Junction(Rule):
+    __slots__ = ("rules", "_compiled")
+    rules: typing.Tuple[Rule, ...]
+    operator: typing.ClassVar[str]
+
+    def __init__(self, *rules: Rule) -> None:
+        object.__setattr__(self, "rules", rules)
+        object.__setattr__(self, "_compiled", None)
+
+    def __setattr__(self, key: str, value: typing.Any) -> None:
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {key!r}")
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and other.rules == self.rules
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.rules))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(map(repr, self.rules))})"
+
+    def item_requirements(self) -> typing.Dict[int, typing.Set[str]]:
+        requirements: typing.Dict[int, typing.Set[str]] = {}
+        for rule in self.rules:
+            for player, items in rule.item_requirements().items():
+                requirements.setdefault(player, set()).update(items)
+        return requirements
+
+    def _flattened(self) -> typing.List[Rule]:
+        """simplified child rules, with nested junctions of the same type merged in and duplicates removed"""
+        rules: typing.List[Rule] = []
+        for rule in self.rules:
+            rule = rule.simplify()
+            for child in (rule.rules if type(rule) is type(self) else (rule,)):
+                if child not in rules:
+                    rules.append(child)
+        return rules
+
+    def _expression(self) -> str:
+        if not self.rules:
+            return str(isinstance(self, And))
+        return f" {self.operator} ".join(f"({rule._expression()})" for rule in self.rules)
+
+
+class And(_Junction):
+    """Requires all of rules. And() is always True."""
+    __slots__ = ()
+    operator = "and"
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return all(rule.evaluate(state) for rule in self.rules)
+
+    def simplify(self) -> Rule:
+        rules: typing.List[Rule] = []
+        counts: typing.Dict[typing.Tuple[str, int], Has] = {}
+        for rule in self._flattened():
+            if rule == Or():
+                return rule
+            if rule == And():
+                continue
+            if isinstance(rule, Has):
+                # having more of an item implies having fewer
+                key = rule.item, rule.player
+                if key in counts:
+                    if rule.count > counts[key].count:
+                        rules[rules.index(counts[key])] = counts[key] = rule
+                    continue
+                counts[key] = rule
+            rules.append(rule)
+        return rules[0] if len(rules) == 1 else And(*rules)
+
+
+class Or(_Junction):
+    """Requires any of rules. Or() is always False."""
+    __slots__ = ()
+    operator = "or"
+
+    def evaluate(self, state: "BaseClasses.CollectionState") -> bool:
+        return any(rule.evaluate(state) for rule in self.rules)
+
+    def simplify(self) -> Rule:
+        rules: typing.List[Rule] = []
+        counts: typing.Dict[typing.Tuple[str, int], Has] = {}
+        for rule in self._flattened():
+            if rule == And():
+                return rule
+            if rule == Or():
+                continue
+            if isinstance(rule, Has):
+                # having fewer of an item is implied by having more
+                key = rule.item, rule.player
+                if key in counts:
+                    if rule.count < counts[key].count:
+                        rules[rules.index(counts[key])] = counts[key] = rule
+                    continue
+                counts[key] = rule
+            rules.append(rule)
+        return rules[0] if len(rules) == 1 else Or(*rules)
+
+
+def _rule_of(access_rule: typing.Any) -> typing.Optional[Rule]:
+    """Returns the IR of a compiled access rule, or None for plain callables."""
+    if isinstance(access_rule, Rule):
+        return access_rule
+    rule = getattr(access_rule, "rule", None)
+    return rule if isinstance(rule, Rule) else None
+
+
+def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
+             rule: typing.Union[CollectionRule, Rule]):
+    spot.access_rule = rule.compile() if isinstance(rule, Rule) else rule
 
 
-def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule, combine="and"):
+def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
+             rule: typing.Union[CollectionRule, Rule], combine="and"):
     old_rule = spot.access_rule
+    if isinstance(rule, Rule):
+        old_ir = _rule_of(old_rule)
+        if old_ir is not None:
+            # both sides are IR, so combine them into a single compiled rule
+            spot.access_rule = (And(rule, old_ir) if combine == "and" else Or(rule, old_ir)).compile()
+            return
+        rule = rule.compile()
     # empty rule, replace instead of add
     if old_rule is Location.access_rule or old_rule is Entrance.access_rule:
         spot.access_rule = rule if combine == "and" else old_rule